@@ -0,0 +1,149 @@
+# ai_service/audit_log.py
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(title, description, category, goal_amount) -> str:
+    """Stable hash of the fields a prediction was made from"""
+    content = '\x00'.join(str(value) for value in (title, description, category, goal_amount))
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class MongoAuditSink:
+    """Bulk inserts into a capped collection (created on first use if missing)"""
+
+    def __init__(self, db, collection_name: str = 'prediction_audit', capped_size_mb: int = 512):
+        if collection_name not in db.list_collection_names():
+            try:
+                db.create_collection(collection_name, capped=True, size=capped_size_mb * 2 ** 20)
+            except Exception as e:
+                logger.warning(f"Could not create capped audit collection, using a regular one: {e}")
+        self.collection = db[collection_name]
+
+    def write(self, records: List[Dict]):
+        self.collection.insert_many(records, ordered=False)
+
+
+class FileAuditSink:
+    """Appends JSON lines to hourly files, e.g. audit-2025091014.jsonl"""
+
+    def __init__(self, directory: str = 'audit'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, records: List[Dict]):
+        path = os.path.join(self.directory, f"audit-{datetime.now(timezone.utc):%Y%m%d%H}.jsonl")
+        with open(path, 'a') as f:
+            f.write(''.join(json.dumps(record, default=str) + '\n' for record in records))
+
+
+class AuditLog:
+    """
+    Structured prediction audit log written off the verification path.
+
+    record() only does a non-blocking put on a bounded queue; a daemon thread
+    drains it and writes records in bulk to the sink. When the queue is full
+    the record is dropped and counted rather than slowing verification down.
+    """
+
+    def __init__(self, sink, max_queue: int = 10000, batch_size: int = 500, flush_interval: float = 1.0):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stop_event = threading.Event()
+        self._lock = threading.Lock()
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+        self._thread = threading.Thread(target=self._run, name='audit-log', daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_env(cls, db) -> Optional['AuditLog']:
+        """Build the audit log for AUDIT_LOG_SINK=mongo (default) or file, None when off"""
+        sink_type = os.getenv('AUDIT_LOG_SINK', 'mongo').lower()
+        try:
+            if sink_type == 'mongo':
+                sink = MongoAuditSink(db, os.getenv('AUDIT_LOG_COLLECTION', 'prediction_audit'),
+                                      int(os.getenv('AUDIT_LOG_CAPPED_SIZE_MB', 512)))
+            elif sink_type == 'file':
+                sink = FileAuditSink(os.getenv('AUDIT_LOG_DIR', 'audit'))
+            else:
+                return None
+            return cls(
+                sink,
+                max_queue=int(os.getenv('AUDIT_LOG_MAX_QUEUE', 10000)),
+                batch_size=int(os.getenv('AUDIT_LOG_BATCH_SIZE', 500)),
+                flush_interval=float(os.getenv('AUDIT_LOG_FLUSH_INTERVAL', 1.0))
+            )
+        except Exception as e:
+            logger.error(f"Error setting up audit log: {e}")
+            return None
+
+    def record(self, entry: Dict) -> bool:
+        """Queue one record without blocking; returns False when it was dropped"""
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            with self._lock:
+                self.stats['dropped'] += 1
+            return False
+        with self._lock:
+            self.stats['recorded'] += 1
+        return True
+
+    def _run(self):
+        while not (self._stop_event.is_set() and self._queue.empty()):
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: List[Dict]):
+        try:
+            self.sink.write(batch)
+            with self._lock:
+                self.stats['written'] += len(batch)
+                self.stats['batches'] += 1
+        except Exception as e:
+            with self._lock:
+                self.stats['failed'] += len(batch)
+            logger.error(f"Error writing {len(batch)} audit records: {e}")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Wait until queued records are written, up to timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 10.0):
+        self._stop_event.set()
+        self._thread.join(timeout)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats['queue_depth'] = self._queue.qsize()
+        return stats
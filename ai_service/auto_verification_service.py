@@ -1,19 +1,35 @@
 # ai_service/auto_verification_service.py
-import pymongo
 import pandas as pd
 import joblib
 import numpy as np
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import json
 import logging
-from typing import List, Dict, Tuple
+import argparse
+from typing import List, Dict, Optional, Tuple
 import os
+import socket
+import time
+import uuid
 from dotenv import load_dotenv
 import re
+from bson import ObjectId
 from sklearn.feature_extraction.text import TfidfVectorizer
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
+from verification_rules import NoteRuleEngine
+from project_columns import fetch_project_columns
+from cascade import CascadeScorer
+from compiled_forest import CompiledForest
+from mongo_connection import connection_manager
+from near_duplicates import NearDuplicateIndex
+from online_learning import load_published_model
+from shadow import ShadowEvaluator, SharedFeatures, split_pipeline
+from feature_memory import FeatureMemoryTracker, describe_matrix
+from category_router import CategoryModelRouter
+from rollups import VerificationRollups
+from audit_log import AuditLog, content_hash
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +38,36 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns copied into prediction audit records
+AUDIT_COLUMNS = ['title', 'description', 'category', 'goalAmount', 'goalAmount_log',
+                 'title_length', 'description_length', 'media_count']
+
+def claimable_filter(now: datetime) -> Dict:
+    """Pending projects with no lease or an expired one"""
+    return {
+        "status": "pending",
+        "$or": [
+            {"lease": {"$exists": False}},
+            {"lease": None},
+            {"lease.expiresAt": {"$lte": now}}
+        ]
+    }
+
+def merge_verification_results(totals: Optional[Dict], result: Dict) -> Dict:
+    """Fold one batch's verify_frame result into a run's totals; stats keep the latest batch's"""
+    if totals is None:
+        return dict(result, projects=list(result.get("projects", [])), batches=1)
+    for key in ("processed", "approved", "rejected", "manual_review"):
+        totals[key] += result.get(key, 0)
+    totals["projects"].extend(result.get("projects", []))
+    for tier, count in result.get("tiers", {}).items():
+        totals.setdefault("tiers", {})[tier] = totals["tiers"].get(tier, 0) + count
+    for key, value in result.items():
+        if key not in ("processed", "approved", "rejected", "manual_review", "projects", "tiers"):
+            totals[key] = value
+    totals["batches"] += 1
+    return totals
+
 class MongoDBProjectVerifier:
     def __init__(self, connection_string=None, database_name="crowdfunding"):
         """
@@ -31,7 +77,25 @@ class MongoDBProjectVerifier:
         self.database_name = database_name
         self.client = None
         self.db = None
+        self.read_db = None
         self.model = None
+        self.model_version = None
+        self.model_source = os.getenv('MODEL_SOURCE', 'file').lower()
+        self.model_refresh_seconds = float(os.getenv('MODEL_REFRESH_SECONDS', 60))
+        self._model_checked_at = 0.0
+        self.cascade = None
+        self.compiled_model = None
+        self.compiled_max_batch = int(os.getenv('COMPILED_MAX_BATCH', 32))
+        self.note_engine = NoteRuleEngine.from_config()
+        self.columnar_preparation = os.getenv('COLUMNAR_PREPARATION', 'False').lower() == 'true'
+        self.shadow = None
+        self.audit_log = None
+        self.feature_memory = FeatureMemoryTracker.from_env()
+        self.category_router = CategoryModelRouter.from_env()
+        self.rollups = None
+        self.lease_seconds = int(os.getenv('PROJECT_LEASE_SECONDS', 300))
+        self.recheck_seconds = int(os.getenv('MANUAL_REVIEW_RECHECK_SECONDS', 1800))
+        self.full_run_batch_size = int(os.getenv('FULL_RUN_BATCH_SIZE', 500))
         
         # Text preprocessing
         try:
@@ -46,12 +110,18 @@ class MongoDBProjectVerifier:
         
         self.connect_to_mongodb()
         self.load_model()
+        self.duplicate_index = NearDuplicateIndex.from_env(self.db)
+        self.shadow = ShadowEvaluator.from_env(self.db)
+        self.audit_log = AuditLog.from_env(self.db)
+        self.rollups = VerificationRollups.from_env(self.db)
     
     def connect_to_mongodb(self):
-        """Connect to MongoDB database"""
+        """Connect to MongoDB database through the shared connection manager"""
         try:
-            self.client = pymongo.MongoClient(self.connection_string)
-            self.db = self.client[self.database_name]
+            self.client = connection_manager.get_client(self.connection_string)
+            self.db = connection_manager.get_database(self.database_name, self.connection_string)
+            # Read-only paths (stats, pending listing, training export) may go to secondaries
+            self.read_db = connection_manager.get_database(self.database_name, self.connection_string, read_only=True)
             # Test connection
             self.client.server_info()
             logger.info(f"Connected to MongoDB database: {self.database_name}")
@@ -60,29 +130,170 @@ class MongoDBProjectVerifier:
             raise
     
     def load_model(self, model_path="project_verification_model.pkl"):
-        """Load the trained ML model"""
+        """Load the trained ML model, or the latest published online model when MODEL_SOURCE=online"""
+        if self.model_source == 'online':
+            self.refresh_model(force=True)
+            return
+        if self.category_router is not None and self.category_router.fallback_path:
+            # Routed scoring never touches the global forest; the router loads its fallback on demand
+            self.model = None
+            self.model_version = f"categories@{self.category_router.created_at}"
+            self.cascade = None
+            self.compiled_model = None
+            logger.info("Category routing enabled, global model not loaded")
+            return
         try:
             if os.path.exists(model_path):
                 self.model = joblib.load(model_path)
+                self.model_version = f"file:{os.path.basename(model_path)}@{int(os.path.getmtime(model_path))}"
                 logger.info(f"Model loaded from {model_path}")
+                self.cascade = CascadeScorer.from_env(self.model)
+                self.compiled_model = self.compile_model(self.model)
             else:
                 logger.warning(f"Model file {model_path} not found. Please train the model first.")
                 self.model = None
+                self.cascade = None
+                self.compiled_model = None
         except Exception as e:
             logger.error(f"Error loading model: {e}")
             self.model = None
+            self.cascade = None
+            self.compiled_model = None
     
-    def get_pending_projects(self) -> List[Dict]:
-        """Retrieve all pending projects from MongoDB"""
+    def refresh_model(self, force: bool = False):
+        """Swap in a newer published online model, checking at most every MODEL_REFRESH_SECONDS"""
+        if self.model_source != 'online':
+            return
+        now = time.monotonic()
+        if not force and now - self._model_checked_at < self.model_refresh_seconds:
+            return
+        self._model_checked_at = now
         try:
-            projects_collection = self.db.projects
-            pending_projects = list(projects_collection.find({"status": "pending"}))
+            model, version = load_published_model(self.db, current_version=self.model_version)
+            if model is not None:
+                # The online model is a single linear stage, so there is no cascade or compiled forest
+                self.model = model
+                self.model_version = version
+                self.cascade = None
+                self.compiled_model = None
+                logger.info(f"Using online model {version}")
+            elif self.model is None:
+                logger.warning("No online model published yet. Run online_learning.py bootstrap first.")
+        except Exception as e:
+            logger.error(f"Error refreshing online model: {e}")
+    
+    def compile_model(self, model):
+        """Compile the model for small-batch scoring when INFERENCE_BACKEND=compiled"""
+        if os.getenv('INFERENCE_BACKEND', 'sklearn').lower() != 'compiled':
+            return None
+        try:
+            compiled = CompiledForest.from_pipeline(model)
+            logger.info(f"Compiled forest backend enabled for batches up to {self.compiled_max_batch}")
+            return compiled
+        except Exception as e:
+            logger.warning(f"Cannot compile model, using sklearn backend: {e}")
+            return None
+    
+    def get_pending_projects(self, read_only: bool = False, sort: List[Tuple[str, int]] = None,
+                             limit: int = 0, extra_filter: Dict = None, projection: Dict = None) -> List[Dict]:
+        """Retrieve pending projects from MongoDB, optionally ordered, limited and projected"""
+        try:
+            projects_collection = (self.read_db if read_only else self.db).projects
+            query = {"status": "pending"}
+            if extra_filter:
+                query.update(extra_filter)
+            cursor = projects_collection.find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort)
+            if limit:
+                cursor = cursor.limit(limit)
+            pending_projects = list(cursor)
             logger.info(f"Retrieved {len(pending_projects)} pending projects")
             return pending_projects
         except Exception as e:
             logger.error(f"Error retrieving pending projects: {e}")
             return []
     
+    def claim_pending_projects(self, owner: str, sort: List[Tuple[str, int]] = None, limit: int = 0,
+                               extra_filter: Dict = None, lease_seconds: int = None) -> Tuple[Optional[str], List[Dict]]:
+        """
+        Lease claimable pending projects to owner so workers, the scheduler and
+        full runs never score the same project at once.
+        Returns (batch token, candidates holding _id and the sort fields); the
+        filter is re-checked per document, so concurrent claims never overlap.
+        """
+        now = datetime.now(timezone.utc)
+        query = claimable_filter(now)
+        if extra_filter:
+            query = {"$and": [query, extra_filter]}
+        cursor = self.db.projects.find(query, {field: 1 for field, _ in sort or [("_id", 1)]})
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        candidates = list(cursor)
+        if not candidates:
+            return None, []
+        
+        token = uuid.uuid4().hex
+        claim = claimable_filter(now)
+        claim["_id"] = {"$in": [doc["_id"] for doc in candidates]}
+        self.db.projects.update_many(claim, {"$set": {"lease": {
+            "owner": owner,
+            "token": token,
+            "claimedAt": now,
+            "expiresAt": now + timedelta(seconds=lease_seconds or self.lease_seconds)
+        }}})
+        return token, candidates
+    
+    def release_claim(self, token: str, recheck_seconds: int = None):
+        """Defer re-checking of claimed projects that were not decided (left for manual review)"""
+        now = datetime.now(timezone.utc)
+        self.db.projects.update_many({"lease.token": token}, {"$set": {"lease": {
+            "owner": None,
+            "token": None,
+            "expiresAt": now + timedelta(seconds=self.recheck_seconds if recheck_seconds is None else recheck_seconds)
+        }}})
+    
+    def claim_project(self, project_id: str, owner: str) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Lease one project for a single-project verification.
+        Returns (token, None), or (None, reason) when it is not pending or another owner's lease is live.
+        """
+        token, _ = self.claim_pending_projects(owner, limit=1, extra_filter={"_id": ObjectId(project_id)})
+        if token is not None:
+            return token, None
+        project = self.db.projects.find_one({"_id": ObjectId(project_id)}, {"status": 1, "lease": 1})
+        if project is None or project.get("status") != "pending":
+            return None, {"error": "Project is not pending", "status": project.get("status") if project else None}
+        lease = project.get("lease") or {}
+        return None, {"error": "Project is being verified by another process",
+                      "lease_owner": lease.get("owner"), "lease_expires_at": lease.get("expiresAt")}
+    
+    def batch_size(self, default: int) -> int:
+        """Batch size fitting MEMORY_BUDGET_MB given observed feature-matrix sizes"""
+        return self.feature_memory.batch_size(default)
+    
+    def get_pending_project_frame(self) -> pd.DataFrame:
+        """Fetch pending projects as model-ready columns with a server-side projection"""
+        return self.load_project_frame({"status": "pending"})
+    
+    def load_project_frame(self, match: Dict, sort: List[Tuple[str, int]] = None, limit: int = 0) -> pd.DataFrame:
+        """
+        Load matching projects as a model-ready DataFrame, through the columnar
+        projection when COLUMNAR_PREPARATION is enabled. Query errors are raised
+        so callers report them instead of seeing an empty batch.
+        """
+        if self.columnar_preparation:
+            return fetch_project_columns(self.db.projects, match, self.preprocess_text, sort=sort, limit=limit)
+        cursor = self.db.projects.find(match)
+        if sort:
+            cursor = cursor.sort(sort)
+        if limit:
+            cursor = cursor.limit(limit)
+        projects = list(cursor)
+        return self.prepare_project_data(projects) if projects else pd.DataFrame()
+    
     def preprocess_text(self, text):
         """Preprocess text data for ML model"""
         if pd.isna(text) or text is None:
@@ -106,56 +317,61 @@ class MongoDBProjectVerifier:
         
         return ' '.join(words)
     
-    def prepare_project_data(self, projects: List[Dict]) -> pd.DataFrame:
-        """Convert MongoDB project data to DataFrame for ML prediction"""
-        processed_data = []
+    def project_record(self, project: Dict) -> Dict:
+        """Build the feature record for one MongoDB project"""
+        # Handle ObjectId conversion
+        project_id = str(project['_id'])
+        creator_id = str(project.get('creator', ''))
         
-        for project in projects:
-            # Handle ObjectId conversion
-            project_id = str(project['_id'])
-            creator_id = str(project.get('creator', ''))
-            
-            # Process text fields
-            title = project.get('title', '')
-            description = project.get('description', '')
-            
-            title_processed = self.preprocess_text(title)
-            description_processed = self.preprocess_text(description)
-            combined_text = f"{title_processed} {description_processed}"
-            
-            # Create feature set matching training data
-            processed_project = {
-                '_id': project_id,
-                'creator_id': creator_id,
-                'title': title,
-                'description': description,
-                'category': project.get('category', 'Other'),
-                'goalAmount': project.get('goalAmount', 0),
-                'raisedAmount': project.get('raisedAmount', 0),
-                'status': project.get('status', 'pending'),
-                'media_attachments': json.dumps(project.get('images', [])),
-                'createdAt': project.get('createdAt', datetime.now()),
-                'verified_status': 'pending',
-                'verification_notes': '',
-                
-                # Processed features
-                'title_processed': title_processed,
-                'description_processed': description_processed,
-                'combined_text': combined_text,
-                'title_length': len(str(title)),
-                'description_length': len(str(description)),
-                'goalAmount_log': np.log1p(project.get('goalAmount', 1))
-            }
+        # Process text fields
+        title = project.get('title', '')
+        description = project.get('description', '')
+        
+        title_processed = self.preprocess_text(title)
+        description_processed = self.preprocess_text(description)
+        combined_text = f"{title_processed} {description_processed}"
+        
+        # Create feature set matching training data
+        return {
+            '_id': project_id,
+            'creator_id': creator_id,
+            'title': title,
+            'description': description,
+            'category': project.get('category', 'Other'),
+            'goalAmount': project.get('goalAmount', 0),
+            'raisedAmount': project.get('raisedAmount', 0),
+            'status': project.get('status', 'pending'),
+            'media_attachments': json.dumps(project.get('images', [])),
+            'media_count': len(project.get('images') or []),
+            'createdAt': project.get('createdAt', datetime.now()),
+            'verified_status': 'pending',
+            'verification_notes': '',
             
-            processed_data.append(processed_project)
+            # Processed features
+            'title_processed': title_processed,
+            'description_processed': description_processed,
+            'combined_text': combined_text,
+            'title_length': len(str(title)),
+            'description_length': len(str(description)),
+            'goalAmount_log': np.log1p(project.get('goalAmount', 1))
+        }
+    
+    def prepare_project_data(self, projects: List[Dict]) -> pd.DataFrame:
+        """Convert MongoDB project data to DataFrame for ML prediction"""
+        processed_data = [self.project_record(project) for project in projects]
         
         df = pd.DataFrame(processed_data)
         logger.info(f"Prepared {len(df)} projects for prediction")
         return df
     
-    def predict_projects(self, df: pd.DataFrame) -> List[Dict]:
-        """Make predictions on project data"""
-        if self.model is None:
+    def predict_projects(self, df: pd.DataFrame, confidence_threshold: float = None) -> List[Dict]:
+        """
+        Make predictions on project data.
+        With shadow models configured, the batch is also scored by each candidate;
+        confidence_threshold is only used to compare their decisions.
+        """
+        self.refresh_model()
+        if self.model is None and self.category_router is None:
             logger.error("Model not loaded. Cannot make predictions.")
             return []
         
@@ -163,76 +379,156 @@ class MongoDBProjectVerifier:
             # Prepare features for prediction
             X = df[['combined_text', 'category', 'goalAmount_log', 'title_length', 'description_length']]
             
-            # Get predictions and probabilities
-            predictions = self.model.predict(X)
-            probabilities = self.model.predict_proba(X)
+            # Shared transforms are computed once per batch for the primary and shadow models
+            features = SharedFeatures(X) if self.shadow is not None else None
+            primary = self.shadow.primary(self.model) if self.shadow is not None and self.model is not None else None
+            started = time.perf_counter()
+            
+            # Get probabilities, through the cascade when enabled
+            tiers = None
+            Xt = None
+            if self.category_router is not None:
+                # Per-category models, with the global model for categories without one
+                probabilities, tiers = self.category_router.predict_proba(X, self.model)
+            elif self.compiled_model is not None and len(df) <= self.compiled_max_batch:
+                probabilities = self.compiled_model.predict_proba(X.to_dict('records'))
+                tiers = np.full(len(df), 'compiled', dtype=object)
+            else:
+                # Transform once so the feature matrix can be measured and shared
+                preprocessor, classifier = split_pipeline(self.model)
+                if preprocessor is not None:
+                    Xt = primary.transform(features) if primary is not None else preprocessor.transform(X)
+                if self.cascade is not None:
+                    probabilities, tiers = self.cascade.predict_proba(X, Xt)
+                elif Xt is not None:
+                    probabilities = classifier.predict_proba(Xt)
+                else:
+                    probabilities = self.model.predict_proba(X)
+            classes = self.category_router.classes_ if self.category_router is not None else self.model.classes_
+            predictions = classes[np.argmax(probabilities, axis=1)]
+            
+            if self.shadow is not None:
+                approval_column = list(classes).index(1)
+                self.shadow.evaluate(features, df['_id'], probabilities[:, approval_column],
+                                     time.perf_counter() - started, self.model_version, confidence_threshold)
             
             results = []
             for i, (project_id, prediction, prob) in enumerate(zip(df['_id'], predictions, probabilities)):
-                confidence = max(prob)  # Confidence is the highest probability
-                
-                result = {
-                    'project_id': project_id,
-                    'prediction': int(prediction),
-                    'confidence': float(confidence),
-                    'approval_probability': float(prob[1]) if len(prob) > 1 else 0.0,
-                    'rejection_probability': float(prob[0]) if len(prob) > 0 else 0.0
-                }
-                results.append(result)
+                results.append(self.build_prediction_result(
+                    project_id, prediction, prob, tier=str(tiers[i]) if tiers is not None else None
+                ))
             
-            logger.info(f"Made predictions for {len(results)} projects")
+            if Xt is not None:
+                self.feature_memory.observe(Xt, len(df))
+                logger.info(f"Made predictions for {len(results)} projects (features: {describe_matrix(Xt)})")
+            else:
+                logger.info(f"Made predictions for {len(results)} projects")
             return results
             
         except Exception as e:
             logger.error(f"Error making predictions: {e}")
             return []
     
-    def generate_verification_notes(self, project_data: Dict, prediction: int, confidence: float) -> str:
-        """Generate verification notes based on prediction and project analysis"""
-        notes = []
+    def build_prediction_result(self, project_id: str, prediction, prob, tier: str = None) -> Dict:
+        """Shape one prediction for callers and the API"""
+        confidence = max(prob)  # Confidence is the highest probability
         
-        if prediction == 0:  # Rejected
-            # Analyze common rejection reasons
-            if project_data.get('description_length', 0) < 50:
-                notes.append("Description too brief")
-            
-            if project_data.get('goalAmount', 0) > 100000:
-                notes.append("Goal amount appears unrealistic")
-            
-            title = str(project_data.get('title', '')).lower()
-            personal_indicators = ['buy me', 'personal', 'vacation', 'luxury', 'birthday', 'trip']
-            if any(indicator in title for indicator in personal_indicators):
-                notes.append("Appears to be personal request rather than community project")
-            
-            media_attachments = project_data.get('media_attachments', '[]')
+        result = {
+            'project_id': project_id,
+            'prediction': int(prediction),
+            'confidence': float(confidence),
+            'approval_probability': float(prob[1]) if len(prob) > 1 else 0.0,
+            'rejection_probability': float(prob[0]) if len(prob) > 0 else 0.0
+        }
+        if tier is not None:
+            result['tier'] = tier
+        return result
+    
+    def predict_project(self, project: Dict) -> Tuple[Dict, Dict]:
+        """
+        Score a single MongoDB project, returning (prediction result, feature record).
+        Uses the compiled backend when available so no DataFrame is built.
+        """
+        record = self.project_record(project)
+        self.refresh_model()
+        if self.compiled_model is None or self.category_router is not None:
+            predictions = self.predict_projects(pd.DataFrame([record]))
+            return (predictions[0] if predictions else None), record
+        
+        try:
+            prob = self.compiled_model.predict_proba([record])[0]
+            prediction = self.compiled_model.classes_[np.argmax(prob)]
+            return self.build_prediction_result(record['_id'], prediction, prob, tier='compiled'), record
+        except Exception as e:
+            logger.error(f"Error making prediction: {e}")
+            return None, record
+    
+    def find_near_duplicates(self, project_ids, texts, persist: bool = True) -> List:
+        """Near-duplicate match (project_id, similarity) or None per project"""
+        if self.duplicate_index is None:
+            return [None] * len(project_ids)
+        try:
+            return self.duplicate_index.check_batch(project_ids, texts, persist=persist)
+        except Exception as e:
+            logger.error(f"Error checking near-duplicates: {e}")
+            return [None] * len(project_ids)
+    
+    @staticmethod
+    def near_duplicate_note(match) -> List[str]:
+        if not match:
+            return []
+        return [f"Near-duplicate of {match[0]} ({match[1]*100:.0f}% similar)"]
+    
+    def audit_prediction(self, prediction_result: Dict, row, threshold: float, decision: str, latency_ms: float,
+                         source: str, dry_run: bool = False, updated: bool = None):
+        """Queue a structured audit record for one prediction (never blocks)"""
+        if self.audit_log is None:
+            return
+        self.audit_log.record({
+            "timestamp": datetime.now(timezone.utc),
+            "source": source,
+            "projectId": str(prediction_result['project_id']),
+            "contentHash": content_hash(row['title'], row['description'], row['category'], row['goalAmount']),
+            "modelVersion": self.model_version,
+            "tier": prediction_result.get('tier'),
+            "features": {
+                "category": row['category'],
+                "goalAmount_log": float(row['goalAmount_log']),
+                "title_length": int(row['title_length']),
+                "description_length": int(row['description_length']),
+                "media_count": int(row['media_count'])
+            },
+            "approvalProbability": prediction_result['approval_probability'],
+            "rejectionProbability": prediction_result['rejection_probability'],
+            "confidence": prediction_result['confidence'],
+            "threshold": threshold,
+            "decision": decision,
+            "dryRun": dry_run,
+            "updated": updated,
+            "latencyMs": latency_ms
+        })
+    
+    def generate_verification_notes(self, project_data: Dict, prediction: int, confidence: float,
+                                    near_duplicate=None) -> str:
+        """Generate verification notes for a single project"""
+        columns = {field: [value] for field, value in project_data.items()}
+        if 'media_count' not in project_data:
             try:
-                attachments = json.loads(media_attachments)
-                if not attachments or len(attachments) == 0:
-                    notes.append("No supporting media provided")
-            except:
+                columns['media_count'] = [len(json.loads(project_data.get('media_attachments', '[]')))]
+            except Exception:
                 pass
-            
-            vague_patterns = ['trust me', 'urgent', 'need money', 'please help']
-            description = str(project_data.get('description', '')).lower()
-            if any(pattern in description for pattern in vague_patterns):
-                notes.append("Vague or insufficient project details")
-        
-        else:  # Approved
-            notes.append("Project meets community funding criteria")
-            
-            if confidence > 0.9:
-                notes.append("High confidence approval")
-            elif confidence > 0.8:
-                notes.append("Good confidence approval")
-        
-        base_note = f"Auto-verified with {confidence*100:.1f}% confidence"
-        if notes:
-            return f"{base_note}. {'; '.join(notes)}"
-        else:
-            return base_note
+        return self.note_engine.evaluate(
+            columns, [prediction], [confidence], [self.near_duplicate_note(near_duplicate)]
+        )[0]
     
-    def update_project_status(self, project_id: str, prediction: int, confidence: float, notes: str) -> bool:
-        """Update project status in MongoDB"""
+    def update_project_status(self, project_id: str, prediction: int, confidence: float, notes: str,
+                              lease_token: str = None) -> bool:
+        """
+        Update project status in MongoDB.
+        The write only applies while the project is still pending, so a moderator's
+        decision is never overwritten; with a lease_token also only while that
+        lease is still held.
+        """
         try:
             projects_collection = self.db.projects
             
@@ -246,13 +542,16 @@ class MongoDBProjectVerifier:
                 "verificationConfidence": confidence
             }
             
-            result = projects_collection.update_one(
-                {"_id": pymongo.ObjectId(project_id)},
-                {"$set": update_data}
-            )
+            query = {"_id": ObjectId(project_id), "status": "pending"}
+            update = {"$set": update_data}
+            if lease_token is not None:
+                query["lease.token"] = lease_token
+                update["$unset"] = {"lease": ""}
+            
+            result = projects_collection.update_one(query, update)
             
             if result.modified_count > 0:
-                logger.info(f"Updated project {project_id} to {new_status}")
+                logger.debug(f"Updated project {project_id} to {new_status}")
                 return True
             else:
                 logger.warning(f"Failed to update project {project_id}")
@@ -262,30 +561,98 @@ class MongoDBProjectVerifier:
             logger.error(f"Error updating project {project_id}: {e}")
             return False
     
+    def mark_manual_review(self, project_ids: List[str]) -> set:
+        """Stamp manualReviewAt on projects left for review for the first time; returns the ids newly stamped"""
+        if not project_ids:
+            return set()
+        try:
+            unmarked = {"_id": {"$in": [ObjectId(pid) for pid in project_ids]}, "manualReviewAt": {"$exists": False}}
+            new_ids = [doc["_id"] for doc in self.db.projects.find(unmarked, {"_id": 1})]
+            if new_ids:
+                self.db.projects.update_many(
+                    {"_id": {"$in": new_ids}, "manualReviewAt": {"$exists": False}},
+                    {"$set": {"manualReviewAt": datetime.now(timezone.utc)}}
+                )
+            return {str(oid) for oid in new_ids}
+        except Exception as e:
+            logger.error(f"Error marking {len(project_ids)} projects for manual review: {e}")
+            return set()
+    
     def run_automated_verification(self, confidence_threshold: float = 0.75, dry_run: bool = False) -> Dict:
         """Main function to run automated verification"""
         try:
             logger.info("Starting automated project verification...")
             
-            # Step 1: Get pending projects
-            pending_projects = self.get_pending_projects()
-            if not pending_projects:
+            # Dry runs only read, so the whole claimable backlog is scored at once
+            if dry_run:
+                df = self.load_project_frame(claimable_filter(datetime.now(timezone.utc)))
+                if df.empty:
+                    logger.info("No pending projects found")
+                    return {"processed": 0, "approved": 0, "rejected": 0, "manual_review": 0}
+                return self.verify_frame(df, confidence_threshold, dry_run)
+            
+            # Real runs lease one batch at a time in _id order, so every lease is short
+            # and workers running alongside skip only what this run is working on
+            owner = f"run:{socket.gethostname()}:{os.getpid()}"
+            totals = None
+            last_id = None
+            while True:
+                token, candidates = self.claim_pending_projects(
+                    owner, sort=[("_id", 1)], limit=self.batch_size(self.full_run_batch_size),
+                    extra_filter={"_id": {"$gt": last_id}} if last_id is not None else None
+                )
+                if not candidates:
+                    break
+                last_id = candidates[-1]["_id"]
+                try:
+                    df = self.load_project_frame({"lease.token": token})
+                    if df.empty:
+                        continue
+                    result = self.verify_frame(df, confidence_threshold, dry_run, lease_token=token)
+                finally:
+                    self.release_claim(token)
+                if "error" in result:
+                    return result
+                totals = merge_verification_results(totals, result)
+            
+            if totals is None:
                 logger.info("No pending projects found")
                 return {"processed": 0, "approved": 0, "rejected": 0, "manual_review": 0}
+            return totals
             
-            # Step 2: Prepare data for ML
-            df = self.prepare_project_data(pending_projects)
-            
+        except Exception as e:
+            logger.error(f"Error in automated verification: {e}")
+            return {"error": str(e)}
+    
+    def verify_frame(self, df: pd.DataFrame, confidence_threshold: float = 0.75, dry_run: bool = False,
+                     lease_token: str = None) -> Dict:
+        """Score prepared projects, write confident decisions and summarise the batch"""
+        try:
             # Step 3: Make predictions
-            predictions = self.predict_projects(df)
+            started = time.perf_counter()
+            predictions = self.predict_projects(df, confidence_threshold)
+            latency_ms = (time.perf_counter() - started) * 1000 / max(len(df), 1)
             if not predictions:
                 logger.error("Failed to make predictions")
                 return {"processed": 0, "approved": 0, "rejected": 0, "manual_review": 0}
             
-            # Step 4: Process results
+            # Step 4: Flag near-duplicates and generate notes for the whole batch at once
+            near_duplicates = self.find_near_duplicates(df['_id'], df['combined_text'], persist=not dry_run)
+            notes_batch = self.note_engine.evaluate(
+                df,
+                [p['prediction'] for p in predictions],
+                [p['confidence'] for p in predictions],
+                [self.near_duplicate_note(match) for match in near_duplicates]
+            )
+            
+            audit_rows = df[AUDIT_COLUMNS].to_dict('records') if self.audit_log is not None else None
+            
+            # Step 5: Process results
             approved = 0
             rejected = 0
             manual_review = 0
+            rollup_confidences = []
+            review_confidences = {}
             processed_projects = []
             
             for i, prediction_result in enumerate(predictions):
@@ -293,17 +660,16 @@ class MongoDBProjectVerifier:
                 prediction = prediction_result['prediction']
                 confidence = prediction_result['confidence']
                 
-                # Get original project data for note generation
-                project_data = df[df['_id'] == project_id].iloc[0].to_dict()
-                
+                success = None
                 if confidence >= confidence_threshold:
-                    # Generate verification notes
-                    notes = self.generate_verification_notes(project_data, prediction, confidence)
+                    notes = notes_batch[i]
                     
                     if not dry_run:
                         # Update database
-                        success = self.update_project_status(project_id, prediction, confidence, notes)
+                        success = self.update_project_status(project_id, prediction, confidence, notes,
+                                                             lease_token=lease_token)
                         if success:
+                            rollup_confidences.append(confidence)
                             if prediction == 1:
                                 approved += 1
                             else:
@@ -317,24 +683,65 @@ class MongoDBProjectVerifier:
                     
                     processed_projects.append({
                         'project_id': project_id,
-                        'title': project_data.get('title', ''),
+                        'title': df['title'].iat[i],
                         'prediction': 'approved' if prediction == 1 else 'rejected',
                         'confidence': confidence,
                         'notes': notes
                     })
+                    if 'tier' in prediction_result:
+                        processed_projects[-1]['tier'] = prediction_result['tier']
+                    if near_duplicates[i]:
+                        processed_projects[-1]['near_duplicate_of'] = {
+                            'project_id': near_duplicates[i][0],
+                            'similarity': near_duplicates[i][1]
+                        }
                     
                 else:
                     manual_review += 1
-                    logger.info(f"Project {project_id} requires manual review (confidence: {confidence:.3f})")
+                    logger.debug(f"Project {project_id} requires manual review (confidence: {confidence:.3f})")
+                    review_confidences[project_id] = confidence
+                
+                if audit_rows is not None:
+                    self.audit_prediction(
+                        prediction_result, audit_rows[i], confidence_threshold,
+                        ('approved' if prediction == 1 else 'rejected') if confidence >= confidence_threshold else 'manual_review',
+                        latency_ms, source='batch', dry_run=dry_run, updated=success
+                    )
+            
+            if not dry_run:
+                # Re-scored projects still awaiting review are not counted again in the rollups
+                new_manual_review = 0
+                if self.rollups is not None:
+                    for project_id in self.mark_manual_review(list(review_confidences)):
+                        new_manual_review += 1
+                        rollup_confidences.append(review_confidences[project_id])
+                self.record_rollup(approved, rejected, new_manual_review, rollup_confidences)
             
             result = {
                 "processed": len(processed_projects),
                 "approved": approved,
                 "rejected": rejected,
                 "manual_review": manual_review,
+                "model_version": self.model_version,
                 "projects": processed_projects
             }
             
+            if self.cascade is not None or self.category_router is not None:
+                tier_counts = {}
+                for prediction_result in predictions:
+                    tier = prediction_result.get('tier')
+                    tier_counts[tier] = tier_counts.get(tier, 0) + 1
+                result["tiers"] = tier_counts
+            if self.cascade is not None:
+                result["cascade"] = self.cascade.get_stats()
+            if self.category_router is not None:
+                result["category_models"] = self.category_router.get_stats()
+            if self.shadow is not None:
+                result["shadow"] = self.shadow.get_stats()
+            if self.audit_log is not None:
+                result["audit_log"] = self.audit_log.get_stats()
+            result["feature_memory"] = self.feature_memory.get_stats()
+            
             logger.info(f"Verification complete: {approved} approved, {rejected} rejected, {manual_review} for manual review")
             return result
             
@@ -342,10 +749,26 @@ class MongoDBProjectVerifier:
             logger.error(f"Error in automated verification: {e}")
             return {"error": str(e)}
     
+    def record_rollup(self, approved: int, rejected: int, manual_review: int, confidences: List[float]):
+        """Add a written batch to the hourly and daily rollups"""
+        if self.rollups is None:
+            return
+        try:
+            self.rollups.record(approved, rejected, manual_review, confidences)
+        except Exception as e:
+            logger.error(f"Error updating verification rollups: {e}")
+    
+    def get_verification_trends(self, granularity: str = 'hour', start: datetime = None,
+                                end: datetime = None) -> Dict:
+        """Verification trends read only from the rollup collection"""
+        if self.rollups is None:
+            return {"error": "Verification rollups are disabled"}
+        return self.rollups.trends(granularity, start, end)
+    
     def get_verification_stats(self) -> Dict:
         """Get current verification statistics from database"""
         try:
-            projects_collection = self.db.projects
+            projects_collection = self.read_db.projects
             
             # Get status counts
             pipeline = [
@@ -370,18 +793,59 @@ class MongoDBProjectVerifier:
             logger.error(f"Error getting verification stats: {e}")
             return {"error": str(e)}
     
+    def export_training_data(self, output_path: str = 'communityfund_projects.csv') -> int:
+        """Export decided projects in the CSV layout train_model.py expects"""
+        try:
+            cursor = self.read_db.projects.find(
+                {"status": {"$in": ["approved", "rejected"]}},
+                {"creator": 1, "title": 1, "description": 1, "category": 1, "goalAmount": 1,
+                 "raisedAmount": 1, "status": 1, "images": 1, "createdAt": 1, "verificationNotes": 1}
+            )
+            rows = [{
+                '_id': str(project['_id']),
+                'creator_id': str(project.get('creator', '')),
+                'title': project.get('title', ''),
+                'description': project.get('description', ''),
+                'category': project.get('category', 'Other'),
+                'goalAmount': project.get('goalAmount', 0),
+                'raisedAmount': project.get('raisedAmount', 0),
+                'status': project.get('status'),
+                'media_attachments': json.dumps(project.get('images', [])),
+                'createdAt': project.get('createdAt'),
+                'verified_status': project.get('status'),
+                'verification_notes': project.get('verificationNotes', '')
+            } for project in cursor]
+            pd.DataFrame(rows).to_csv(output_path, index=False)
+            logger.info(f"Exported {len(rows)} labelled projects to {output_path}")
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Error exporting training data: {e}")
+            return 0
+    
     def close_connection(self):
-        """Close MongoDB connection"""
-        if self.client:
-            self.client.close()
-            logger.info("MongoDB connection closed")
+        """Release this verifier's handles; the shared client stays open for other users"""
+        if self.audit_log is not None:
+            self.audit_log.flush()
+            self.audit_log.close()
+            self.audit_log = None
+        self.client = None
+        self.db = None
+        self.read_db = None
 
 def main():
     """Main function for running the verification service"""
+    parser = argparse.ArgumentParser(description='Run automated project verification')
+    parser.add_argument('--export-training', metavar='CSV', help='Export labelled projects for training and exit')
+    args = parser.parse_args()
+    
     # Initialize the verifier
     verifier = MongoDBProjectVerifier()
     
     try:
+        if args.export_training:
+            verifier.export_training_data(args.export_training)
+            return
+        
         # Get current stats
         logger.info("Current verification statistics:")
         stats = verifier.get_verification_stats()
@@ -398,6 +862,7 @@ def main():
         
     finally:
         verifier.close_connection()
+        connection_manager.close_all()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
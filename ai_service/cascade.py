@@ -0,0 +1,115 @@
+# ai_service/cascade.py
+import logging
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+TIER_LINEAR = 'linear'
+TIER_FOREST = 'forest'
+
+
+class CascadeScorer:
+    """
+    Two-tier scorer: a sparse linear model decides confident projects and
+    only projects whose linear approval probability falls inside the
+    uncertainty band are escalated to the random forest.
+
+    Both tiers consume the same matrix from the forest pipeline's fitted
+    preprocessor, so features are computed once per batch. A small sample of
+    linear-decided projects is also scored by the forest to keep measuring
+    how often the cascade agrees with forest-only decisions.
+    """
+
+    def __init__(self, pipeline, linear_model, band_low: float = 0.25, band_high: float = 0.75,
+                 audit_rate: float = 0.05, random_state: Optional[int] = None):
+        self.preprocessor = pipeline.named_steps['preprocessor']
+        self.forest = pipeline.named_steps['classifier']
+        self.linear = linear_model
+        self.band_low = band_low
+        self.band_high = band_high
+        self.audit_rate = audit_rate
+        self.classes_ = np.asarray(self.forest.classes_)
+        self._rng = np.random.default_rng(random_state)
+        self._lock = threading.Lock()
+        self.stats = {'linear': 0, 'forest': 0, 'audited': 0, 'audit_agreed': 0}
+
+        if not np.array_equal(np.asarray(self.linear.classes_), self.classes_):
+            raise ValueError("Linear and forest models were trained on different classes")
+
+    @classmethod
+    def from_env(cls, pipeline) -> Optional['CascadeScorer']:
+        """Build the cascade when CASCADE_ENABLED is set and the linear tier exists"""
+        if os.getenv('CASCADE_ENABLED', 'False').lower() != 'true':
+            return None
+        if not hasattr(pipeline, 'named_steps') or 'preprocessor' not in pipeline.named_steps:
+            logger.warning("Cascade requires a preprocessor/classifier pipeline, disabling it")
+            return None
+
+        linear_path = os.getenv('CASCADE_MODEL_PATH', 'project_verification_linear.pkl')
+        try:
+            if not os.path.exists(linear_path):
+                logger.warning(f"Linear tier {linear_path} not found. Retrain the model to enable the cascade.")
+                return None
+            scorer = cls(
+                pipeline,
+                joblib.load(linear_path),
+                band_low=float(os.getenv('CASCADE_BAND_LOW', 0.25)),
+                band_high=float(os.getenv('CASCADE_BAND_HIGH', 0.75)),
+                audit_rate=float(os.getenv('CASCADE_AUDIT_RATE', 0.05))
+            )
+            logger.info(f"Cascade enabled with band [{scorer.band_low}, {scorer.band_high}]")
+            return scorer
+        except Exception as e:
+            logger.error(f"Error loading cascade linear tier: {e}")
+            return None
+
+    def predict_proba(self, X, Xt=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a batch, returning (probabilities, tiers).
+
+        `Xt` may be passed when the caller already transformed `X`.
+        """
+        if Xt is None:
+            Xt = self.preprocessor.transform(X)
+        probabilities = self.linear.predict_proba(Xt)
+        positive = list(self.classes_).index(1) if 1 in self.classes_ else -1
+        approval = probabilities[:, positive]
+
+        escalate = (approval >= self.band_low) & (approval <= self.band_high)
+        audit = ~escalate & (self._rng.random(len(approval)) < self.audit_rate)
+        forest_rows = np.flatnonzero(escalate | audit)
+
+        audit_agreed = 0
+        if len(forest_rows):
+            forest_probabilities = self.forest.predict_proba(Xt[forest_rows])
+            escalated = escalate[forest_rows]
+            audited = ~escalated
+            audit_agreed = int(np.sum(
+                forest_probabilities[audited].argmax(axis=1) == probabilities[forest_rows[audited]].argmax(axis=1)
+            ))
+            probabilities[forest_rows[escalated]] = forest_probabilities[escalated]
+
+        tiers = np.where(escalate, TIER_FOREST, TIER_LINEAR)
+
+        with self._lock:
+            self.stats['forest'] += int(escalate.sum())
+            self.stats['linear'] += int((~escalate).sum())
+            self.stats['audited'] += int(audit.sum())
+            self.stats['audit_agreed'] += audit_agreed
+
+        return probabilities, tiers
+
+    def get_stats(self) -> Dict:
+        """Tier counts and agreement with the forest on audited projects"""
+        with self._lock:
+            stats = dict(self.stats)
+        total = stats['linear'] + stats['forest']
+        stats['escalation_rate'] = stats['forest'] / total if total else 0.0
+        stats['audit_agreement'] = stats['audit_agreed'] / stats['audited'] if stats['audited'] else None
+        stats['band'] = [self.band_low, self.band_high]
+        return stats
@@ -0,0 +1,146 @@
+# ai_service/category_router.py
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FALLBACK_ROUTE = 'fallback'
+
+
+class CategoryModelRouter:
+    """
+    Routes each project to its category's model, or to the manifest's fallback.
+
+    Category models listed in the manifest written by `train_model.py
+    --per-category` are loaded on first use into a bounded LRU cache, so
+    categories without traffic hold no memory and the least recently used
+    model is evicted once max_loaded is exceeded. The fallback is loaded the
+    first time a category without a model is scored and then kept; older
+    manifests without one fall back to the model passed to predict_proba.
+    """
+
+    def __init__(self, models_dir: str, manifest: Dict, max_loaded: int = 4):
+        self.models_dir = models_dir
+        self.categories = manifest.get('categories', {})
+        self.fallback_path = manifest.get('fallback')
+        self.classes_ = np.array(manifest.get('classes', [0, 1]))
+        self.created_at = manifest.get('created_at')
+        self.max_loaded = max_loaded
+        self._models = OrderedDict()
+        self._fallback = None
+        self.fallback_load_ms = None
+        self._lock = threading.Lock()
+        self.stats = {
+            category: {'loads': 0, 'hits': 0, 'evictions': 0, 'rows': 0, 'load_ms': 0.0}
+            for category in self.categories
+        }
+        self.fallback_rows = 0
+
+    @classmethod
+    def from_env(cls) -> Optional['CategoryModelRouter']:
+        """Build the router when CATEGORY_ROUTING is enabled and a manifest exists"""
+        if os.getenv('CATEGORY_ROUTING', 'False').lower() != 'true':
+            return None
+        models_dir = os.getenv('CATEGORY_MODELS_DIR', 'models')
+        manifest_path = os.path.join(models_dir, 'manifest.json')
+        try:
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Category routing disabled, cannot read {manifest_path}: {e}")
+            return None
+        router = cls(models_dir, manifest, max_loaded=int(os.getenv('CATEGORY_MODEL_CACHE_SIZE', 4)))
+        logger.info(f"Category routing enabled for {len(router.categories)} categories "
+                    f"(cache size {router.max_loaded})")
+        return router
+
+    def get_model(self, category: str):
+        """The category's model, loading and evicting as needed; None when it has no model"""
+        entry = self.categories.get(category)
+        if entry is None:
+            return None
+        with self._lock:
+            model = self._models.get(category)
+            if model is not None:
+                self._models.move_to_end(category)
+                self.stats[category]['hits'] += 1
+                return model
+
+            started = time.perf_counter()
+            model = joblib.load(os.path.join(self.models_dir, entry['path']))
+            self.stats[category]['loads'] += 1
+            self.stats[category]['load_ms'] += (time.perf_counter() - started) * 1000
+            self._models[category] = model
+            while len(self._models) > self.max_loaded:
+                evicted, _ = self._models.popitem(last=False)
+                self.stats[evicted]['evictions'] += 1
+                logger.debug(f"Evicted category model {evicted}")
+            return model
+
+    def get_fallback(self):
+        """The manifest's fallback model, loaded on first use; None when the manifest has none"""
+        if not self.fallback_path:
+            return None
+        with self._lock:
+            if self._fallback is None:
+                started = time.perf_counter()
+                self._fallback = joblib.load(os.path.join(self.models_dir, self.fallback_path))
+                self.fallback_load_ms = (time.perf_counter() - started) * 1000
+                logger.info(f"Loaded category fallback model {self.fallback_path} "
+                            f"in {self.fallback_load_ms:.0f} ms")
+            return self._fallback
+
+    def predict_proba(self, X, fallback_model=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score a batch grouped by category, returning (probabilities, routes).
+        Columns follow self.classes_; routes name the model used per row.
+        fallback_model, when given, replaces the manifest's fallback.
+        """
+        classes = list(self.classes_)
+        probabilities = np.zeros((len(X), len(classes)))
+        routes = np.empty(len(X), dtype=object)
+        categories = X['category'].astype(str).to_numpy()
+
+        for category in np.unique(categories):
+            rows = np.flatnonzero(categories == category)
+            try:
+                model = self.get_model(category)
+            except Exception as e:
+                logger.error(f"Error loading model for category {category}, using fallback: {e}")
+                model = None
+            if model is None:
+                model = fallback_model if fallback_model is not None else self.get_fallback()
+                if model is None:
+                    raise RuntimeError(f"No model for category {category} and no fallback model")
+                routes[rows] = FALLBACK_ROUTE
+                with self._lock:
+                    self.fallback_rows += len(rows)
+            else:
+                routes[rows] = f"category:{category}"
+                with self._lock:
+                    self.stats[category]['rows'] += len(rows)
+
+            scores = model.predict_proba(X.iloc[rows])
+            for column, cls in enumerate(model.classes_):
+                probabilities[rows, classes.index(cls)] = scores[:, column]
+
+        return probabilities, routes
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'loaded': list(self._models),
+                'cache_size': self.max_loaded,
+                'fallback_loaded': self._fallback is not None,
+                'fallback_load_ms': self.fallback_load_ms,
+                'fallback_rows': self.fallback_rows,
+                'categories': {category: dict(stats) for category, stats in self.stats.items()}
+            }
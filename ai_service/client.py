@@ -1,19 +1,89 @@
 import requests
 import json
 import argparse
+import asyncio
+import random
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Overload and gateway statuses retried for GETs
+RETRY_STATUSES = (429, 502, 503, 504)
+# A gateway error does not mean the service skipped a POST; only these guarantee it did
+POST_RETRY_STATUSES = (429, 503)
+
+def retry_statuses(method):
+    return POST_RETRY_STATUSES if method.upper() == 'POST' else RETRY_STATUSES
+
+class VerificationRetry(Retry):
+    """urllib3 Retry that limits POST status retries to POST_RETRY_STATUSES"""
+    
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code not in retry_statuses(method):
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
 
 class VerificationClient:
-    def __init__(self, base_url="http://localhost:5001"):
-        self.base_url = base_url
+    def __init__(self, base_url="http://localhost:5001", timeout=(3.05, 30), verify_timeout=300,
+                 retries=3, backoff_factor=0.5, pool_maxsize=10, session=None):
+        """
+        Client with a pooled keep-alive session.
+        
+        `timeout` is a (connect, read) tuple for regular calls; full /verify runs
+        use `verify_timeout` for reads. Connection failures and overload responses
+        (429/502/503/504 for GETs, only 429/503 for POSTs) are retried with
+        exponential backoff, honouring Retry-After. Read timeouts are not retried
+        since the service may still be working on the request.
+        """
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.verify_timeout = verify_timeout
+        self.pool_maxsize = pool_maxsize
+        self.session = session or self._build_session(retries, backoff_factor, pool_maxsize)
+    
+    @staticmethod
+    def _build_session(retries, backoff_factor, pool_maxsize):
+        retry = VerificationRetry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self):
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
     
     def health_check(self):
         """Check if the service is healthy"""
-        response = requests.get(f"{self.base_url}/health")
+        response = self.session.get(f"{self.base_url}/health", timeout=self.timeout)
         return response.json()
     
     def get_stats(self):
         """Get verification statistics"""
-        response = requests.get(f"{self.base_url}/stats")
+        response = self.session.get(f"{self.base_url}/stats", timeout=self.timeout)
+        return response.json()
+    
+    def get_trends(self, granularity="hour", start=None, end=None):
+        """Get hourly or daily verification trends"""
+        params = {"granularity": granularity, "start": start, "end": end}
+        response = self.session.get(f"{self.base_url}/stats/trends", timeout=self.timeout,
+                                    params={k: v for k, v in params.items() if v is not None})
         return response.json()
     
     def run_verification(self, confidence_threshold=0.75, dry_run=False):
@@ -22,48 +92,187 @@ class VerificationClient:
             "confidence_threshold": confidence_threshold,
             "dry_run": dry_run
         }
-        response = requests.post(f"{self.base_url}/verify", json=data)
+        response = self.session.post(f"{self.base_url}/verify", json=data,
+                                     timeout=(self.timeout[0], self.verify_timeout))
         return response.json()
     
     def get_pending_projects(self):
         """Get pending projects"""
-        response = requests.get(f"{self.base_url}/pending")
+        response = self.session.get(f"{self.base_url}/pending", timeout=self.timeout)
         return response.json()
     
     def verify_single_project(self, project_id, dry_run=False):
         """Verify a single project"""
         data = {"dry_run": dry_run}
-        response = requests.post(f"{self.base_url}/verify/project/{project_id}", json=data)
+        response = self.session.post(f"{self.base_url}/verify/project/{project_id}", json=data,
+                                     timeout=self.timeout)
         return response.json()
+    
+    def verify_many(self, project_ids, dry_run=False, concurrency=None):
+        """
+        Verify many projects concurrently over the pooled session.
+        Returns {project_id: result}; failures are reported as {"error": ...}.
+        """
+        concurrency = min(concurrency or self.pool_maxsize, self.pool_maxsize)
+        
+        def verify(project_id):
+            try:
+                return self.verify_single_project(project_id, dry_run)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return {"error": str(e)}
+        
+        project_ids = list(project_ids)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+            return dict(zip(project_ids, executor.map(verify, project_ids)))
+
+class AsyncVerificationClient:
+    def __init__(self, base_url="http://localhost:5001", timeout=30, connect_timeout=3.05, verify_timeout=300,
+                 retries=3, backoff_factor=0.5, pool_maxsize=10):
+        """asyncio variant of VerificationClient, backed by an aiohttp connection pool"""
+        try:
+            import aiohttp
+        except ImportError:
+            raise ImportError("AsyncVerificationClient requires aiohttp: pip install -r requirements-async.txt")
+        self._aiohttp = aiohttp
+        self.base_url = base_url.rstrip('/')
+        self.timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=timeout)
+        self.verify_timeout = aiohttp.ClientTimeout(total=None, connect=connect_timeout, sock_read=verify_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_maxsize = pool_maxsize
+        self._session = None
+    
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = self._aiohttp.TCPConnector(limit=self.pool_maxsize)
+            self._session = self._aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+    
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.close()
+    
+    async def _request(self, method, path, timeout=None, **kwargs):
+        """
+        Send a request, retrying failed connection attempts and overload responses
+        with backoff. Read timeouts and dropped connections are not retried since
+        the request may already have been sent.
+        """
+        session = await self._get_session()
+        statuses = retry_statuses(method)
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.request(method, f"{self.base_url}{path}", timeout=timeout or self.timeout,
+                                           **kwargs) as response:
+                    if response.status in statuses and attempt < self.retries:
+                        retry_after = response.headers.get('Retry-After')
+                        delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+                        await self._backoff(attempt, delay)
+                        continue
+                    return await response.json(content_type=None)
+            except self._aiohttp.ClientConnectorError:
+                if attempt >= self.retries:
+                    raise
+                await self._backoff(attempt)
+    
+    async def _backoff(self, attempt, delay=None):
+        if delay is None:
+            delay = self.backoff_factor * (2 ** attempt) * (0.5 + random.random() / 2)
+        await asyncio.sleep(delay)
+    
+    async def health_check(self):
+        """Check if the service is healthy"""
+        return await self._request('GET', '/health')
+    
+    async def get_stats(self):
+        """Get verification statistics"""
+        return await self._request('GET', '/stats')
+    
+    async def get_trends(self, granularity="hour", start=None, end=None):
+        """Get hourly or daily verification trends"""
+        params = {"granularity": granularity, "start": start, "end": end}
+        return await self._request('GET', '/stats/trends', params={k: v for k, v in params.items() if v is not None})
+    
+    async def run_verification(self, confidence_threshold=0.75, dry_run=False):
+        """Run automated verification"""
+        data = {
+            "confidence_threshold": confidence_threshold,
+            "dry_run": dry_run
+        }
+        return await self._request('POST', '/verify', json=data, timeout=self.verify_timeout)
+    
+    async def get_pending_projects(self):
+        """Get pending projects"""
+        return await self._request('GET', '/pending')
+    
+    async def verify_single_project(self, project_id, dry_run=False):
+        """Verify a single project"""
+        return await self._request('POST', f"/verify/project/{project_id}", json={"dry_run": dry_run})
+    
+    async def verify_many(self, project_ids, dry_run=False, concurrency=None):
+        """
+        Verify many projects with at most `concurrency` requests in flight.
+        Returns {project_id: result}; failures are reported as {"error": ...}.
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency or self.pool_maxsize))
+        
+        async def verify(project_id):
+            async with semaphore:
+                try:
+                    return await self.verify_single_project(project_id, dry_run)
+                except (self._aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                    return {"error": str(e)}
+        
+        project_ids = list(project_ids)
+        results = await asyncio.gather(*(verify(project_id) for project_id in project_ids))
+        return dict(zip(project_ids, results))
 
 def main():
     parser = argparse.ArgumentParser(description='AI Verification Service Client')
     parser.add_argument('--url', default='http://localhost:5001', help='Service URL')
-    parser.add_argument('--action', choices=['health', 'stats', 'verify', 'pending'], 
+    parser.add_argument('--action', choices=['health', 'stats', 'trends', 'verify', 'pending', 'verify-projects'],
                        default='health', help='Action to perform')
     parser.add_argument('--dry-run', action='store_true', help='Dry run mode')
     parser.add_argument('--confidence', type=float, default=0.75, help='Confidence threshold')
+    parser.add_argument('--project-ids', nargs='*', default=[], help='Project IDs for verify-projects')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests for verify-projects')
+    parser.add_argument('--timeout', type=float, default=30, help='Read timeout in seconds')
+    parser.add_argument('--retries', type=int, default=3, help='Retries for connection errors and overload')
+    parser.add_argument('--granularity', choices=['hour', 'day'], default='hour', help='Bucket size for trends')
     
     args = parser.parse_args()
     
-    client = VerificationClient(args.url)
+    client = VerificationClient(args.url, timeout=(3.05, args.timeout), retries=args.retries,
+                                pool_maxsize=max(args.concurrency, 1))
     
     try:
         if args.action == 'health':
             result = client.health_check()
         elif args.action == 'stats':
             result = client.get_stats()
+        elif args.action == 'trends':
+            result = client.get_trends(args.granularity)
         elif args.action == 'verify':
             result = client.run_verification(args.confidence, args.dry_run)
         elif args.action == 'pending':
             result = client.get_pending_projects()
+        elif args.action == 'verify-projects':
+            result = client.verify_many(args.project_ids, args.dry_run, args.concurrency)
         
         print(json.dumps(result, indent=2))
-        
+    
     except requests.exceptions.RequestException as e:
         print(f"Error connecting to service: {e}")
     except Exception as e:
         print(f"Error: {e}")
+    finally:
+        client.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,244 @@
+# ai_service/compiled_forest.py
+import argparse
+import json
+import logging
+import re
+import time
+from collections import Counter
+from typing import Dict, List, Mapping, Sequence
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FEATURE_FIELDS = ['combined_text', 'category', 'goalAmount_log', 'title_length', 'description_length']
+
+
+class CompiledForest:
+    """
+    Flat-array evaluator for the fitted TF-IDF + one-hot + random forest pipeline.
+
+    The vocabulary, idf weights, category index and every tree are copied
+    into plain dicts and numpy arrays, so scoring a single project or a small
+    batch is a tokenisation pass plus a vectorised walk over all trees at
+    once, without sklearn input validation, ColumnTransformer dispatch or
+    pandas. Feature values are compared as float32, exactly like sklearn's
+    trees, so probabilities match the pipeline's predict_proba.
+    """
+
+    def __init__(self, blocks: List[Dict], n_features: int, children_left: np.ndarray,
+                 children_right: np.ndarray, feature: np.ndarray, threshold: np.ndarray,
+                 leaf_values: np.ndarray, roots: np.ndarray, classes: np.ndarray):
+        self.blocks = blocks
+        self.n_features = n_features
+        self.children_left = children_left
+        self.children_right = children_right
+        self.feature = feature
+        self.threshold = threshold
+        self.leaf_values = leaf_values
+        self.roots = roots
+        self.classes_ = classes
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> 'CompiledForest':
+        """Compile a fitted preprocessor/classifier pipeline"""
+        preprocessor = pipeline.named_steps['preprocessor']
+        forest = pipeline.named_steps['classifier']
+        if not isinstance(forest, RandomForestClassifier):
+            raise ValueError(f"Unsupported classifier for compilation: {type(forest).__name__}")
+
+        blocks = []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if isinstance(transformer, str) and transformer == 'drop':
+                continue
+            block = cls._compile_block(transformer, columns)
+            block['offset'] = offset
+            offset += block['width']
+            blocks.append(block)
+
+        # Concatenate every tree into one node table; leaves loop back onto
+        # themselves so all trees can be walked in lockstep
+        lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+        base = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(tree.node_count) + base
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + base))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + base))
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+            leaf = tree.value[:, 0, :]
+            totals = leaf.sum(axis=1, keepdims=True)
+            values.append(np.divide(leaf, totals, out=np.zeros_like(leaf), where=totals > 0))
+            roots.append(base)
+            base += tree.node_count
+
+        return cls(
+            blocks=blocks,
+            n_features=offset,
+            children_left=np.concatenate(lefts).astype(np.intp),
+            children_right=np.concatenate(rights).astype(np.intp),
+            feature=np.concatenate(features).astype(np.intp),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            leaf_values=np.concatenate(values),
+            roots=np.asarray(roots, dtype=np.intp),
+            classes=np.asarray(forest.classes_)
+        )
+
+    @staticmethod
+    def _compile_block(transformer, columns) -> Dict:
+        """Capture the fitted state of one ColumnTransformer block"""
+        if isinstance(transformer, TfidfVectorizer):
+            if (transformer.analyzer != 'word' or transformer.tokenizer is not None
+                    or transformer.preprocessor is not None or transformer.strip_accents is not None
+                    or transformer.stop_words is not None):
+                raise ValueError("Only default word analysis is supported for compiled TF-IDF")
+            return {
+                'kind': 'tfidf',
+                'column': columns,
+                'width': len(transformer.vocabulary_),
+                'vocabulary': dict(transformer.vocabulary_),
+                'idf': transformer.idf_.copy() if transformer.use_idf else None,
+                'token_pattern': re.compile(transformer.token_pattern),
+                'lowercase': transformer.lowercase,
+                'ngram_range': transformer.ngram_range,
+                'binary': transformer.binary,
+                'sublinear_tf': transformer.sublinear_tf,
+                'norm': transformer.norm,
+            }
+        if isinstance(transformer, OneHotEncoder):
+            if transformer.drop is not None or len(transformer.categories_) != 1:
+                raise ValueError("Only single-column one-hot encoding without drop is supported")
+            categories = transformer.categories_[0]
+            return {
+                'kind': 'onehot',
+                'column': columns[0],
+                'width': len(categories),
+                'index': {category: i for i, category in enumerate(categories)},
+            }
+        # Fitted 'passthrough' blocks are identity FunctionTransformers; low-memory
+        # models cast with np.asarray, which compiled features (float32) already do
+        if isinstance(transformer, str) and transformer == 'passthrough' or (
+                isinstance(transformer, FunctionTransformer) and transformer.func in (None, np.asarray)):
+            return {'kind': 'passthrough', 'columns': list(columns), 'width': len(columns)}
+        raise ValueError(f"Unsupported transformer for compilation: {transformer!r}")
+
+    def _tfidf_row(self, block: Dict, text: str, row: np.ndarray):
+        if block['lowercase']:
+            text = text.lower()
+        tokens = block['token_pattern'].findall(text)
+        min_n, max_n = block['ngram_range']
+        vocabulary = block['vocabulary']
+        counts = Counter()
+        for n in range(min_n, max_n + 1):
+            for i in range(len(tokens) - n + 1):
+                index = vocabulary.get(' '.join(tokens[i:i + n]))
+                if index is not None:
+                    counts[index] += 1
+        if not counts:
+            return
+
+        indices = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        values = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if block['binary']:
+            values[:] = 1.0
+        elif block['sublinear_tf']:
+            values = np.log(values) + 1.0
+        if block['idf'] is not None:
+            values *= block['idf'][indices]
+        if block['norm'] == 'l2':
+            values /= np.sqrt(np.dot(values, values))
+        elif block['norm'] == 'l1':
+            values /= np.abs(values).sum()
+        row[block['offset'] + indices] = values
+
+    def transform(self, records: Sequence[Mapping]) -> np.ndarray:
+        """Build the dense float32 feature matrix for a few records"""
+        X = np.zeros((len(records), self.n_features), dtype=np.float64)
+        for r, record in enumerate(records):
+            row = X[r]
+            for block in self.blocks:
+                if block['kind'] == 'tfidf':
+                    self._tfidf_row(block, str(record.get(block['column'], '') or ''), row)
+                elif block['kind'] == 'onehot':
+                    index = block['index'].get(record.get(block['column']))
+                    if index is not None:
+                        row[block['offset'] + index] = 1.0
+                else:
+                    for i, column in enumerate(block['columns']):
+                        row[block['offset'] + i] = float(record.get(column, 0) or 0)
+        # sklearn trees evaluate splits on float32 inputs
+        return X.astype(np.float32)
+
+    def predict_proba(self, records: Sequence[Mapping]) -> np.ndarray:
+        """Average leaf class distributions over all trees"""
+        X = self.transform(records)
+        n = len(records)
+        nodes = np.broadcast_to(self.roots, (n, len(self.roots))).copy()
+        rows = np.arange(n)[:, None]
+        while True:
+            feature = self.feature[nodes]
+            go_left = X[rows, feature] <= self.threshold[nodes]
+            next_nodes = np.where(go_left, self.children_left[nodes], self.children_right[nodes])
+            if np.array_equal(next_nodes, nodes):
+                break
+            nodes = next_nodes
+        return self.leaf_values[nodes].mean(axis=1)
+
+    def predict(self, records: Sequence[Mapping]) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(records), axis=1)]
+
+
+def benchmark(model_path: str, csv_path: str, repeats: int = 200) -> Dict:
+    """Compare compiled and sklearn probabilities and single-project latency"""
+    import joblib
+    from predict_verification import preprocess_csv_data
+
+    pipeline = joblib.load(model_path)
+    compiled = CompiledForest.from_pipeline(pipeline)
+
+    df = preprocess_csv_data(csv_path)
+    X = df[FEATURE_FIELDS]
+    records = X.to_dict('records')
+
+    expected = pipeline.predict_proba(X)
+    actual = compiled.predict_proba(records)
+    max_abs_diff = float(np.abs(expected - actual).max())
+
+    def latencies(fn):
+        timings = []
+        for i in range(repeats):
+            start = time.perf_counter()
+            fn(i % len(records))
+            timings.append(time.perf_counter() - start)
+        return np.percentile(np.array(timings) * 1e6, [50, 99])
+
+    sklearn_p50, sklearn_p99 = latencies(lambda i: pipeline.predict_proba(X.iloc[i:i + 1]))
+    compiled_p50, compiled_p99 = latencies(lambda i: compiled.predict_proba(records[i:i + 1]))
+
+    return {
+        'rows': len(records),
+        'max_abs_probability_diff': max_abs_diff,
+        'sklearn_us': {'p50': float(sklearn_p50), 'p99': float(sklearn_p99)},
+        'compiled_us': {'p50': float(compiled_p50), 'p99': float(compiled_p99)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check and benchmark the compiled forest backend')
+    parser.add_argument('csv_file', help='Path to CSV file containing project data')
+    parser.add_argument('--model', default='project_verification_model.pkl', help='Path to ML model file')
+    parser.add_argument('--repeats', type=int, default=200, help='Single-project calls per backend')
+
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.model, args.csv_file, args.repeats), indent=2))
+
+
+if __name__ == "__main__":
+    main()
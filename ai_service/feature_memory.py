@@ -0,0 +1,76 @@
+# ai_service/feature_memory.py
+import os
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+from scipy import sparse
+
+
+def matrix_nbytes(X) -> int:
+    """Bytes held by a feature matrix, counting index arrays of sparse matrices"""
+    if sparse.issparse(X):
+        X = X.tocsr() if X.format != 'csr' else X
+        return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes)
+    return int(np.asarray(X).nbytes)
+
+
+def describe_matrix(X) -> str:
+    kind = type(X).__name__ if sparse.issparse(X) else 'dense'
+    return f"{matrix_nbytes(X) / 2 ** 20:.2f} MB {np.dtype(X.dtype).name} {kind} {X.shape[0]}x{X.shape[1]}"
+
+
+class FeatureMemoryTracker:
+    """
+    Tracks feature-matrix memory per scored batch and sizes batches to a budget.
+
+    The per-project cost is a moving average of observed matrices, so a
+    float32 sparse model (about half the bytes of float64) gets batches
+    about twice as large under the same MEMORY_BUDGET_MB.
+    """
+
+    def __init__(self, budget_mb: Optional[float] = None, smoothing: float = 0.2, max_batch_size: int = 100000):
+        self.budget_bytes = budget_mb * 2 ** 20 if budget_mb else None
+        self.smoothing = smoothing
+        self.max_batch_size = max_batch_size
+        self.bytes_per_project = None
+        self.last_batch_bytes = 0
+        self.peak_batch_bytes = 0
+        self.dtype = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'FeatureMemoryTracker':
+        budget = os.getenv('MEMORY_BUDGET_MB')
+        return cls(budget_mb=float(budget) if budget else None,
+                   max_batch_size=int(os.getenv('MEMORY_MAX_BATCH_SIZE', 100000)))
+
+    def observe(self, X, rows: int) -> int:
+        nbytes = matrix_nbytes(X)
+        with self._lock:
+            per_project = nbytes / max(rows, 1)
+            if self.bytes_per_project is None:
+                self.bytes_per_project = per_project
+            else:
+                self.bytes_per_project += self.smoothing * (per_project - self.bytes_per_project)
+            self.last_batch_bytes = nbytes
+            self.peak_batch_bytes = max(self.peak_batch_bytes, nbytes)
+            self.dtype = np.dtype(X.dtype).name
+        return nbytes
+
+    def batch_size(self, default: int) -> int:
+        """Projects per batch that fit the budget, or default without a budget or observations"""
+        with self._lock:
+            if not self.budget_bytes or not self.bytes_per_project:
+                return default
+            return int(max(1, min(self.max_batch_size, self.budget_bytes // self.bytes_per_project)))
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'dtype': self.dtype,
+                'last_batch_mb': self.last_batch_bytes / 2 ** 20,
+                'peak_batch_mb': self.peak_batch_bytes / 2 ** 20,
+                'bytes_per_project': self.bytes_per_project,
+                'budget_mb': self.budget_bytes / 2 ** 20 if self.budget_bytes else None
+            }
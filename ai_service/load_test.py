@@ -0,0 +1,332 @@
+# ai_service/load_test.py
+import argparse
+import json
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import numpy as np
+import requests
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ["Education", "Health", "Environment", "Community", "Other"]
+
+TOPICS = [
+    "community garden", "after-school tutoring", "clean water pump", "food bank", "library renovation",
+    "solar lights", "youth football club", "senior care visits", "recycling drive", "health camp"
+]
+FILLER = [
+    "local families", "volunteers", "neighbourhood", "workshops", "weekly sessions", "supplies",
+    "equipment", "transparent budget", "monthly updates", "partner school", "city council", "training"
+]
+RED_FLAGS = ["trust me", "urgent", "need money", "please help", "buy me", "vacation", "birthday trip"]
+
+# Endpoint name -> (method, path template, JSON body builder)
+ENDPOINTS = {
+    'verify_project': ('POST', '/verify/project/{project_id}', lambda dry_run: {"dry_run": dry_run}),
+    'verify': ('POST', '/verify', lambda dry_run: {"dry_run": dry_run}),
+    'pending': ('GET', '/pending', None),
+    'stats': ('GET', '/stats', None),
+    'health': ('GET', '/health', None),
+}
+
+
+def synthetic_projects(count: int, seed: int = 42) -> List[Dict]:
+    """Generate pending projects that look like real submissions, with some suspicious ones"""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    projects = []
+    for i in range(count):
+        topic = rng.choice(TOPICS)
+        words = rng.sample(FILLER, rng.randint(3, 8))
+        if rng.random() < 0.2:
+            words += rng.sample(RED_FLAGS, rng.randint(1, 2))
+        description = f"We will run a {topic} project with {', '.join(words)}."
+        projects.append({
+            "creator": f"user{rng.randint(1, count // 5 + 1)}",
+            "title": f"{topic.title()} #{i}",
+            "description": description * rng.randint(1, 3),
+            "category": rng.choice(CATEGORIES),
+            "goalAmount": float(rng.choice([500, 2000, 15000, 50000, 250000])),
+            "raisedAmount": 0,
+            "status": "pending",
+            "images": [f"https://picsum.photos/seed/{i}-{n}/400/300" for n in range(rng.randint(0, 3))],
+            "createdAt": now - timedelta(minutes=count - i)
+        })
+    return projects
+
+
+# Serving modes mongomock cannot run: the columnar $project uses $strLenCP and the
+# near-duplicate lookup $unionWith, which it does not implement, and its bulk_write
+# fails under pymongo 4.x
+STAND_IN_UNSUPPORTED = {
+    'COLUMNAR_PREPARATION': "the columnar projection uses $strLenCP",
+    'NEAR_DUPLICATE_INDEX': "the near-duplicate index uses $unionWith and bulk_write",
+}
+
+
+def stand_in_conflicts() -> List[str]:
+    """Enabled serving modes the MongoDB stand-in cannot run"""
+    return [f"{name} ({reason})" for name, reason in STAND_IN_UNSUPPORTED.items()
+            if os.getenv(name, 'False').lower() == 'true']
+
+
+def serve(port: int, seed_count: int, mongo_uri: str = None):
+    """Run the verification API against mongo_uri, or a seeded in-process MongoDB stand-in"""
+    from mongo_connection import connection_manager
+
+    if mongo_uri:
+        os.environ['MONGODB_URI'] = mongo_uri
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            sys.exit("The MongoDB stand-in requires mongomock: pip install -r requirements-loadtest.txt")
+        # Never let the stand-in pick up a real cluster URI from .env
+        os.environ['MONGODB_URI'] = 'mongodb://localhost:27017'
+        connection_manager.client_factory = mongomock.MongoClient
+
+    import verification_api
+
+    projects = verification_api.get_verifier().db.projects
+    if seed_count and projects.count_documents({}) == 0:
+        projects.insert_many(synthetic_projects(seed_count))
+        logger.info(f"Seeded {seed_count} synthetic projects")
+
+    verification_api.app.run(host='127.0.0.1', port=port, threaded=True)
+
+
+class ProcessSampler(threading.Thread):
+    """Samples CPU and RSS of the server process while a run is active"""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._stop_event = threading.Event()
+        try:
+            import psutil
+            self.process = psutil.Process(pid) if pid else None
+        except ImportError:
+            logger.warning("psutil not installed (see requirements-loadtest.txt), "
+                           "server CPU and memory will not be reported")
+            self.process = None
+
+    def run(self):
+        if self.process is None:
+            return
+        self.process.cpu_percent(None)
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.samples.append((self.process.cpu_percent(None), self.process.memory_info().rss))
+            except Exception:
+                break
+
+    def stop(self) -> Dict:
+        self._stop_event.set()
+        self.join(timeout=2)
+        if not self.samples:
+            return {}
+        cpu = np.array([sample[0] for sample in self.samples])
+        rss = np.array([sample[1] for sample in self.samples]) / 2 ** 20
+        return {
+            'cpu_percent_mean': float(cpu.mean()),
+            'cpu_percent_max': float(cpu.max()),
+            'rss_mb_mean': float(rss.mean()),
+            'rss_mb_max': float(rss.max()),
+        }
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    """Parse 'verify_project=6,pending=2,stats=2' into endpoint weights"""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}', expected one of {sorted(ENDPOINTS)}")
+        weights[name] = float(weight or 1)
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def summarize_latencies(latencies: List[float]) -> Dict:
+    if not latencies:
+        return {}
+    values = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'mean_ms': float(values.mean()), 'p50_ms': float(p50), 'p95_ms': float(p95),
+            'p99_ms': float(p99), 'max_ms': float(values.max())}
+
+
+def run_load(base_url: str, weights: Dict[str, float], concurrency: int, duration: float,
+             project_ids: List[str], dry_run: bool = True, server_pid: int = None,
+             timeout: float = 30) -> Dict:
+    """Drive the request mix with `concurrency` closed-loop clients for `duration` seconds"""
+    names = list(weights)
+    cumulative = np.cumsum([weights[name] for name in names])
+    records = {name: {'latencies': [], 'errors': 0, 'statuses': {}} for name in names}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client_loop(worker: int):
+        rng = random.Random(worker)
+        session = requests.Session()
+        while time.monotonic() < deadline:
+            name = names[int(np.searchsorted(cumulative, rng.random() * cumulative[-1], side='right'))]
+            method, path, body = ENDPOINTS[name]
+            if '{project_id}' in path:
+                if not project_ids:
+                    continue
+                path = path.format(project_id=rng.choice(project_ids))
+            started = time.perf_counter()
+            try:
+                response = session.request(method, f"{base_url}{path}",
+                                           json=body(dry_run) if body else None, timeout=timeout)
+                status, error = response.status_code, response.status_code >= 400
+            except requests.exceptions.RequestException:
+                status, error = 'exception', True
+            elapsed = time.perf_counter() - started
+            with lock:
+                record = records[name]
+                record['latencies'].append(elapsed)
+                record['statuses'][str(status)] = record['statuses'].get(str(status), 0) + 1
+                record['errors'] += int(error)
+        session.close()
+
+    sampler = ProcessSampler(server_pid)
+    sampler.start()
+    started = time.monotonic()
+    threads = [threading.Thread(target=client_loop, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    server = sampler.stop()
+
+    all_latencies = [latency for record in records.values() for latency in record['latencies']]
+    total_errors = sum(record['errors'] for record in records.values())
+    return {
+        'concurrency': concurrency,
+        'duration_seconds': round(elapsed, 3),
+        'requests': len(all_latencies),
+        'throughput_rps': len(all_latencies) / elapsed if elapsed else 0.0,
+        'error_rate': total_errors / len(all_latencies) if all_latencies else 0.0,
+        'latency': summarize_latencies(all_latencies),
+        'endpoints': {
+            name: {
+                'requests': len(record['latencies']),
+                'error_rate': record['errors'] / len(record['latencies']) if record['latencies'] else 0.0,
+                'statuses': record['statuses'],
+                'latency': summarize_latencies(record['latencies'])
+            }
+            for name, record in records.items()
+        },
+        'server': server
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_server(base_url: str, timeout: float = 120):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/health", timeout=2).ok:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Service at {base_url} did not become healthy")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the verification API')
+    parser.add_argument('--url', help='Target an already running service instead of starting one')
+    parser.add_argument('--mongo-uri', help='Start the service against this MongoDB instead of the in-process stand-in')
+    parser.add_argument('--seed', type=int, default=2000, help='Synthetic projects to seed into an empty database')
+    parser.add_argument('--mix', default='verify_project=6,pending=2,stats=2',
+                        help=f"Weighted request mix over {', '.join(ENDPOINTS)}")
+    parser.add_argument('--concurrency', default='1,8,32', help='Comma-separated concurrency levels to sweep')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds per concurrency level')
+    parser.add_argument('--timeout', type=float, default=30, help='Per-request timeout in seconds')
+    parser.add_argument('--write', action='store_true', help='Let verify calls update projects (default: dry run)')
+    parser.add_argument('--label', default='', help='Free-form label stored with the results, e.g. serving mode')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port, args.seed, args.mongo_uri)
+        return
+
+    weights = parse_mix(args.mix)
+    if args.url is None and not args.mongo_uri and stand_in_conflicts():
+        sys.exit(f"The MongoDB stand-in cannot run {', '.join(stand_in_conflicts())}; "
+                 f"use --mongo-uri with a real MongoDB to load test these modes")
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        command = [sys.executable, os.path.abspath(__file__), '--serve', '--port', str(port), '--seed', str(args.seed)]
+        if args.mongo_uri:
+            command += ['--mongo-uri', args.mongo_uri]
+        server = subprocess.Popen(command)
+        base_url = f"http://127.0.0.1:{port}"
+
+    try:
+        wait_for_server(base_url)
+        pending = requests.get(f"{base_url}/pending", timeout=args.timeout).json()
+        project_ids = [project['_id'] for project in pending.get('projects', [])]
+        logger.info(f"Load testing {base_url} with {len(project_ids)} pending projects")
+
+        runs = []
+        for concurrency in [int(level) for level in args.concurrency.split(',')]:
+            logger.info(f"Running concurrency {concurrency} for {args.duration:.0f}s")
+            run = run_load(base_url, weights, concurrency, args.duration, project_ids,
+                           dry_run=not args.write, server_pid=server.pid if server else None,
+                           timeout=args.timeout)
+            logger.info(f"concurrency={concurrency} rps={run['throughput_rps']:.1f} "
+                        f"p99={run['latency'].get('p99_ms', 0):.1f}ms errors={run['error_rate']*100:.1f}%")
+            runs.append(run)
+
+        results = {
+            'label': args.label,
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'target': base_url,
+            'stand_in': args.url is None and not args.mongo_uri,
+            'mix': weights,
+            'seeded_projects': args.seed,
+            'dry_run': not args.write,
+            'runs': runs
+        }
+        output = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as f:
+                f.write(output)
+            logger.info(f"Results saved to {args.output}")
+        else:
+            print(output)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    main()
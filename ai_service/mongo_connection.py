@@ -0,0 +1,199 @@
+# ai_service/mongo_connection.py
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pymongo
+from dotenv import load_dotenv
+from pymongo import monitoring
+from pymongo.read_preferences import ReadPreference
+from pymongo.write_concern import WriteConcern
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST,
+}
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value not in (None, '') else default
+
+
+class PoolWaitListener(monitoring.ConnectionPoolListener):
+    """Records how long operations wait to check a connection out of the pool"""
+
+    def __init__(self, window: int = 1000):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._recent = deque(maxlen=window)
+        self.checkouts = 0
+        self.failures = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.connections_created = 0
+        self.pool_clears = 0
+
+    def _record(self, wait: float):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            self._recent.append(wait)
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        # pymongo >= 4.7 reports the duration itself
+        wait = getattr(event, 'duration', None)
+        if wait is None:
+            started = getattr(self._local, 'started', None)
+            wait = time.perf_counter() - started if started is not None else 0.0
+        self._record(wait)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failures += 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            recent = np.array(self._recent) * 1000
+            stats = {
+                'checkouts': self.checkouts,
+                'checkout_failures': self.failures,
+                'connections_created': self.connections_created,
+                'pool_clears': self.pool_clears,
+                'mean_wait_ms': (self.total_wait / self.checkouts * 1000) if self.checkouts else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+            }
+        if len(recent):
+            p50, p95, p99 = np.percentile(recent, [50, 95, 99])
+            stats['recent_wait_ms'] = {'p50': float(p50), 'p95': float(p95), 'p99': float(p99)}
+        return stats
+
+
+class MongoConnectionManager:
+    """
+    Process-wide MongoDB clients shared by the API, scheduler and CLI.
+
+    One client (and therefore one connection pool) is kept per connection
+    string. Pool size, timeouts and write concern come from the environment;
+    read-only callers get a database handle whose reads are routed by
+    MONGODB_READ_ONLY_PREFERENCE (secondaryPreferred by default) so analytics
+    reads stay off the primary.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}
+        self.pool_listener = PoolWaitListener()
+        # Swappable for API-compatible stand-ins (e.g. mongomock in load tests)
+        self.client_factory = pymongo.MongoClient
+
+    def client_options(self) -> Dict:
+        options = {
+            'maxPoolSize': _env_int('MONGODB_MAX_POOL_SIZE', 50),
+            'minPoolSize': _env_int('MONGODB_MIN_POOL_SIZE', 0),
+            'maxIdleTimeMS': _env_int('MONGODB_MAX_IDLE_TIME_MS', None),
+            'waitQueueTimeoutMS': _env_int('MONGODB_WAIT_QUEUE_TIMEOUT_MS', None),
+            'serverSelectionTimeoutMS': _env_int('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 5000),
+            'connectTimeoutMS': _env_int('MONGODB_CONNECT_TIMEOUT_MS', 5000),
+            'socketTimeoutMS': _env_int('MONGODB_SOCKET_TIMEOUT_MS', 30000),
+            'appname': os.getenv('MONGODB_APP_NAME', 'ai-verification-service'),
+            'event_listeners': [self.pool_listener],
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    def write_concern(self) -> Optional[WriteConcern]:
+        w = os.getenv('MONGODB_WRITE_CONCERN_W')
+        if not w:
+            return None
+        journal = os.getenv('MONGODB_WRITE_CONCERN_J')
+        return WriteConcern(
+            w=int(w) if w.isdigit() else w,
+            j=journal.lower() == 'true' if journal else None,
+            wtimeout=_env_int('MONGODB_WRITE_CONCERN_TIMEOUT_MS', None)
+        )
+
+    def get_client(self, connection_string: Optional[str] = None):
+        connection_string = connection_string or os.getenv('MONGODB_URI', 'mongodb://localhost:27017')
+        with self._lock:
+            client = self._clients.get(connection_string)
+            if client is None:
+                client = self.client_factory(connection_string, **self.client_options())
+                self._clients[connection_string] = client
+                logger.info("Created shared MongoDB client")
+            return client
+
+    def get_database(self, database_name: str, connection_string: Optional[str] = None, read_only: bool = False):
+        """Database handle for writes, or for secondary-routed reads when read_only"""
+        client = self.get_client(connection_string)
+        options = {}
+        write_concern = self.write_concern()
+        if write_concern is not None:
+            options['write_concern'] = write_concern
+        if read_only:
+            preference = os.getenv('MONGODB_READ_ONLY_PREFERENCE', 'secondaryPreferred')
+            if preference not in READ_PREFERENCES:
+                logger.warning(f"Unknown read preference '{preference}', using primary")
+                preference = 'primary'
+            options['read_preference'] = READ_PREFERENCES[preference]
+        return client.get_database(database_name, **options)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            clients = len(self._clients)
+        stats = self.pool_listener.get_stats()
+        stats['clients'] = clients
+        stats['max_pool_size'] = self.client_options().get('maxPoolSize')
+        return stats
+
+    def close_all(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            client.close()
+        if clients:
+            logger.info("MongoDB connections closed")
+
+
+connection_manager = MongoConnectionManager()
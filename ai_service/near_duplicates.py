@@ -0,0 +1,196 @@
+# ai_service/near_duplicates.py
+import hashlib
+import logging
+import os
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from bson import Binary
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class MinHasher:
+    """MinHash signatures over word shingles, using multiply-shift hashing"""
+
+    def __init__(self, num_perm: int = 64, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        # Odd multipliers make (a*x + b) mod 2^64 >> 32 a universal family
+        self._a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def shingles(self, text: str) -> List[str]:
+        words = str(text).split()
+        if len(words) <= self.shingle_size:
+            return [' '.join(words)] if words else []
+        return [' '.join(words[i:i + self.shingle_size]) for i in range(len(words) - self.shingle_size + 1)]
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """Signature of a text, or None when it has no words"""
+        shingles = set(self.shingles(text))
+        if not shingles:
+            return None
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        with np.errstate(over='ignore'):
+            permuted = (hashes[:, None] * self._a + self._b) >> np.uint64(32)
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of project texts kept in MongoDB.
+
+    Signatures are split into bands; projects sharing any band bucket are
+    candidates and are confirmed by their estimated Jaccard similarity. Each
+    indexed project is one document holding its signature and band keys, with
+    a multikey (bands, createdAt) index, so a batch fetches only the newest
+    max_bucket candidates of each of its band keys in one aggregation.
+    Processes hold no copy of the index and see each other's writes as soon
+    as they are committed.
+    """
+
+    def __init__(self, collection, num_perm: int = 64, bands: int = 16, threshold: float = 0.8,
+                 max_bucket: int = 1000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.collection = collection
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_bucket = max_bucket
+
+    @classmethod
+    def from_env(cls, db) -> Optional['NearDuplicateIndex']:
+        """Build the index when NEAR_DUPLICATE_INDEX is enabled"""
+        if os.getenv('NEAR_DUPLICATE_INDEX', 'False').lower() != 'true':
+            return None
+        try:
+            index = cls(
+                collection=db[os.getenv('NEAR_DUPLICATE_COLLECTION', 'near_duplicate_index')],
+                num_perm=int(os.getenv('NEAR_DUPLICATE_NUM_PERM', 64)),
+                bands=int(os.getenv('NEAR_DUPLICATE_BANDS', 16)),
+                threshold=float(os.getenv('NEAR_DUPLICATE_THRESHOLD', 0.8)),
+                max_bucket=int(os.getenv('NEAR_DUPLICATE_MAX_BUCKET', 1000))
+            )
+            index.collection.create_index([("bands", 1), ("createdAt", -1)])
+            return index
+        except Exception as e:
+            logger.error(f"Error setting up near-duplicate index: {e}")
+            return None
+
+    def band_keys(self, signature: np.ndarray) -> List[int]:
+        """Stable signed 64-bit bucket keys, one per band"""
+        keys = []
+        for band in range(self.bands):
+            chunk = signature[band * self.rows:(band + 1) * self.rows]
+            digest = hashlib.blake2b(band.to_bytes(2, 'little') + chunk.tobytes(), digest_size=8).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def fetch_candidates(self, keys: Sequence[int], per_key: int,
+                         keys_per_query: int = 256) -> List[Tuple[str, np.ndarray, List[int]]]:
+        """
+        Up to per_key newest indexed projects for each band key, as (id, signature, keys).
+        Each key is its own $unionWith branch served by the (bands, createdAt) index,
+        so a crowded bucket cannot crowd out candidates from the other bands.
+        """
+        def branch(key):
+            return [{"$match": {"bands": key}}, {"$sort": {"createdAt": -1}}, {"$limit": per_key},
+                    {"$project": {"signature": 1, "bands": 1}}]
+
+        keys = list(keys)
+        candidates = {}
+        for start in range(0, len(keys), keys_per_query):
+            chunk = keys[start:start + keys_per_query]
+            pipeline = branch(chunk[0])
+            for key in chunk[1:]:
+                pipeline.append({"$unionWith": {"coll": self.collection.name, "pipeline": branch(key)}})
+            for doc in self.collection.aggregate(pipeline):
+                if doc["_id"] not in candidates:
+                    candidates[doc["_id"]] = (doc["_id"], np.frombuffer(doc["signature"], dtype=np.uint32), doc["bands"])
+        return list(candidates.values())
+
+    def check_batch(self, project_ids: Sequence[str], texts: Sequence[str],
+                    persist: bool = True) -> List[Optional[Tuple[str, float]]]:
+        """
+        Look up each project, then add it so later projects (in this batch
+        or later batches) can match it. Returns one match or None per project.
+        """
+        entries = []
+        for project_id, text in zip(project_ids, texts):
+            signature = self.hasher.signature(text)
+            entries.append((str(project_id), signature, self.band_keys(signature) if signature is not None else None))
+
+        batch_keys = {key for _, signature, keys in entries if signature is not None for key in keys}
+        if not batch_keys:
+            return [None] * len(entries)
+
+        # Candidates for the whole batch, bucketed locally; projects of this
+        # batch are added as they are checked so later ones can match them
+        ids = []
+        signatures = []
+        rows_by_id = {}
+        buckets = {}
+
+        def add(project_id, signature, keys):
+            row = rows_by_id.get(project_id)
+            if row is None:
+                row = rows_by_id[project_id] = len(ids)
+                ids.append(project_id)
+                signatures.append(signature)
+            else:
+                signatures[row] = signature
+            for key in keys:
+                if key in batch_keys:
+                    buckets.setdefault(key, set()).add(row)
+
+        for candidate in self.fetch_candidates(batch_keys, self.max_bucket):
+            add(*candidate)
+
+        matches = []
+        operations = []
+        now = datetime.now(timezone.utc)
+        for project_id, signature, keys in entries:
+            if signature is None:
+                matches.append(None)
+                continue
+            candidates = set()
+            for key in keys:
+                candidates.update(buckets.get(key, ()))
+            candidates.discard(rows_by_id.get(project_id))
+            match = None
+            if candidates:
+                rows = list(candidates)
+                similarities = (np.stack([signatures[row] for row in rows]) == signature).mean(axis=1)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    match = (ids[rows[best]], float(similarities[best]))
+            matches.append(match)
+            if persist:
+                add(project_id, signature, keys)
+                operations.append(UpdateOne(
+                    {"_id": project_id},
+                    {"$set": {"signature": Binary(signature.tobytes()), "bands": keys, "createdAt": now}},
+                    upsert=True
+                ))
+
+        if operations:
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                logger.error(f"Error persisting near-duplicate signatures: {e}")
+        return matches
+
+    def get_stats(self) -> Dict:
+        return {
+            "indexed": self.collection.estimated_document_count(),
+            "bands": self.bands,
+            "rows_per_band": self.rows,
+            "threshold": self.threshold
+        }
@@ -0,0 +1,295 @@
+# ai_service/online_learning.py
+import argparse
+import io
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+from bson import Binary
+from scipy import sparse
+from sklearn.feature_extraction import FeatureHasher
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+
+from run_control import RunLock
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = 'online'
+CLASSES = np.array([0, 1])
+
+
+class OnlineVerificationModel:
+    """
+    Incrementally trainable verification model.
+
+    Features are stateless (hashed text n-grams, hashed category and fixed
+    numeric scaling), so new labelled batches only need SGDClassifier's
+    partial_fit and never a refit of a vocabulary. It takes the same input
+    columns as the forest pipeline.
+    """
+
+    def __init__(self, n_features: int = 2 ** 18, alpha: float = 1e-4, random_state: int = 42):
+        self.text_hasher = HashingVectorizer(n_features=n_features, ngram_range=(1, 2), alternate_sign=False)
+        self.category_hasher = FeatureHasher(n_features=64, input_type='string', alternate_sign=False)
+        self.classifier = SGDClassifier(loss='log_loss', alpha=alpha, random_state=random_state)
+        self.classes_ = CLASSES
+        self.samples_seen = 0
+        self.version = 0
+
+    def transform(self, X: pd.DataFrame):
+        text = self.text_hasher.transform(X['combined_text'].fillna('').astype(str))
+        category = self.category_hasher.transform([[str(c)] for c in X['category'].fillna('Other')])
+        numeric = np.column_stack([
+            X['goalAmount_log'].astype(float) / 15.0,
+            np.log1p(X['title_length'].astype(float)) / 5.0,
+            np.log1p(X['description_length'].astype(float)) / 8.0,
+        ])
+        return sparse.hstack([text, category, sparse.csr_matrix(numeric)], format='csr')
+
+    def partial_fit(self, X: pd.DataFrame, y) -> 'OnlineVerificationModel':
+        y = np.asarray(y, dtype=int)
+        # Weight each batch's classes evenly, like class_weight='balanced' in the forest
+        counts = np.bincount(y, minlength=2).astype(float)
+        weights = len(y) / (2 * np.maximum(counts, 1))
+        self.classifier.partial_fit(self.transform(X), y, classes=CLASSES, sample_weight=weights[y])
+        self.samples_seen += len(y)
+        return self
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classifier.predict_proba(self.transform(X))
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def serialize_model(model) -> bytes:
+    buffer = io.BytesIO()
+    joblib.dump(model, buffer)
+    return buffer.getvalue()
+
+
+def load_published_model(db, current_version: Optional[str] = None, name: str = MODEL_NAME) -> Tuple[object, Optional[str]]:
+    """
+    Fetch the latest published model, returning (model, version).
+    The model is None when nothing is published or current_version is already the latest.
+    """
+    registry = db.model_registry.find_one({"_id": name})
+    if not registry:
+        return None, current_version
+    version = f"{name}:v{registry['version']}"
+    if version == current_version:
+        return None, current_version
+    doc = db.model_versions.find_one({"name": name, "version": registry["version"]})
+    if not doc:
+        logger.warning(f"Registry points at missing model {version}")
+        return None, current_version
+    return joblib.load(io.BytesIO(doc["model"])), version
+
+
+class OnlineLearner:
+    """
+    Consumes moderator-labelled projects and publishes updated model versions.
+
+    Moderator decisions are projects whose status was set by an admin
+    (validatedBy present), which covers manual-review decisions and overturned
+    auto-decisions. Labels are read from the primary after a watermark on
+    updatedAt, re-reading LABEL_OVERLAP_SECONDS before it so decisions that
+    committed late are not missed; the labels already learned inside that
+    window are kept in the registry and skipped. Every update is stored in
+    model_versions (the last MODEL_VERSIONS_KEEP are kept) and model_registry
+    is pointed at it; running verifiers with MODEL_SOURCE=online pick it up
+    on their next refresh.
+
+    Updates and bootstraps of a model hold a RunLock, so the API and a
+    looping CLI never train from the same base and publish the same version;
+    a unique (name, version) index backs this up.
+    """
+
+    def __init__(self, verifier, name: str = MODEL_NAME, batch_size: int = 256):
+        self.verifier = verifier
+        self.db = verifier.db
+        self.name = name
+        self.batch_size = batch_size
+        self.label_overlap = timedelta(seconds=float(os.getenv('LABEL_OVERLAP_SECONDS', 300)))
+        self.versions_to_keep = int(os.getenv('MODEL_VERSIONS_KEEP', 10))
+        self.lock = RunLock(self.db.run_locks, name=f"online_learning:{name}",
+                            lease_seconds=float(os.getenv('RUN_LOCK_LEASE_SECONDS', 900)))
+        try:
+            self.db.model_versions.create_index([("name", 1), ("version", 1)], unique=True)
+        except Exception as e:
+            logger.warning(f"Could not create model version index: {e}")
+
+    def current_model(self) -> Tuple[Optional[OnlineVerificationModel], Dict]:
+        registry = self.db.model_registry.find_one({"_id": self.name}) or {}
+        model, _ = load_published_model(self.db, name=self.name)
+        return model, registry
+
+    def publish(self, model: OnlineVerificationModel, watermark=None, trained_on: int = 0,
+                recent_labels=None) -> int:
+        """Store a new model version, point the registry at it and prune old versions"""
+        registry = self.db.model_registry.find_one({"_id": self.name}) or {}
+        model.version = int(registry.get("version", 0)) + 1
+        now = datetime.now(timezone.utc)
+        self.db.model_versions.insert_one({
+            "name": self.name,
+            "version": model.version,
+            "model": Binary(serialize_model(model)),
+            "samplesSeen": model.samples_seen,
+            "trainedOn": trained_on,
+            "createdAt": now
+        })
+        update = {"version": model.version, "updatedAt": now}
+        if watermark is not None:
+            update["watermark"] = watermark
+        if recent_labels is not None:
+            update["recentLabels"] = recent_labels
+        self.db.model_registry.update_one({"_id": self.name}, {"$set": update}, upsert=True)
+        logger.info(f"Published {self.name} model v{model.version} ({model.samples_seen} samples seen)")
+        
+        if self.versions_to_keep > 0:
+            pruned = self.db.model_versions.delete_many(
+                {"name": self.name, "version": {"$lte": model.version - self.versions_to_keep}}
+            ).deleted_count
+            if pruned:
+                logger.info(f"Pruned {pruned} old {self.name} model versions")
+        return model.version
+
+    def labelled_frame(self, projects) -> Tuple[pd.DataFrame, np.ndarray]:
+        df = self.verifier.prepare_project_data(projects)
+        labels = np.array([1 if project.get("status") == "approved" else 0 for project in projects])
+        return df, labels
+
+    def busy(self) -> Dict:
+        return {"skipped": True, "reason": f"Another process is publishing the {self.name} model",
+                "lock": self.lock.status()}
+
+    def bootstrap(self, csv_path: str, wait_seconds: float = 0) -> Optional[int]:
+        """Train and publish an initial model from the training CSV; None if another publish holds the lock"""
+        with self.lock.hold(wait_seconds, context={"command": "bootstrap"}) as acquired:
+            if not acquired:
+                logger.warning(f"Bootstrap skipped: {self.busy()}")
+                return None
+            return self._bootstrap(csv_path)
+
+    def _bootstrap(self, csv_path: str) -> int:
+        data = pd.read_csv(csv_path)
+        projects = []
+        for row in data.to_dict('records'):
+            try:
+                images = json.loads(row.get('media_attachments') or '[]')
+            except (TypeError, ValueError):
+                images = []
+            status = 'approved' if str(row['verified_status']).lower() in ['approved', '1', 'true', 'yes', 'approve'] else 'rejected'
+            projects.append({
+                "_id": row['_id'], "title": row['title'], "description": row['description'],
+                "category": row['category'], "goalAmount": row['goalAmount'], "images": images, "status": status
+            })
+        df, labels = self.labelled_frame(projects)
+        model = OnlineVerificationModel().partial_fit(df, labels)
+        return self.publish(model, trained_on=len(labels))
+
+    def update(self, wait_seconds: float = 0) -> Dict:
+        """Fold moderator labels that arrived since the last update into a new version"""
+        with self.lock.hold(wait_seconds, context={"command": "update"}) as acquired:
+            if not acquired:
+                return self.busy()
+            return self._update()
+
+    def _update(self) -> Dict:
+        started = time.perf_counter()
+        model, registry = self.current_model()
+        if model is None:
+            model = OnlineVerificationModel()
+        watermark = registry.get("watermark")
+        # Labels learned inside the overlap window, keyed by project id, with the updatedAt learned
+        learned = {label["_id"]: label["updatedAt"] for label in registry.get("recentLabels", [])}
+
+        query = {
+            "status": {"$in": ["approved", "rejected"]},
+            "validatedBy": {"$exists": True, "$ne": None}
+        }
+        if watermark is not None:
+            query["updatedAt"] = {"$gt": watermark - self.label_overlap}
+
+        consumed = 0
+        # The primary, not read_db: a lagging secondary could show decisions after the watermark moved past them
+        cursor = self.db.projects.find(query).sort("updatedAt", 1).batch_size(self.batch_size)
+        batch = []
+        for project in cursor:
+            project_id = str(project["_id"])
+            if project_id in learned and learned[project_id] == project.get("updatedAt"):
+                continue
+            batch.append(project)
+            # Late commits re-read from the overlap window must not move the watermark back
+            updated_at = project.get("updatedAt")
+            if updated_at is not None and (watermark is None or updated_at > watermark):
+                watermark = updated_at
+            if len(batch) >= self.batch_size:
+                consumed += self._learn(model, batch, learned)
+                batch = []
+        if batch:
+            consumed += self._learn(model, batch, learned)
+
+        if consumed == 0:
+            return {"consumed": 0, "version": registry.get("version")}
+
+        recent_labels = [{"_id": project_id, "updatedAt": updated_at}
+                         for project_id, updated_at in learned.items()
+                         if updated_at is not None and updated_at > watermark - self.label_overlap]
+        version = self.publish(model, watermark=watermark, trained_on=consumed, recent_labels=recent_labels)
+        return {
+            "consumed": consumed,
+            "version": version,
+            "samples_seen": model.samples_seen,
+            "elapsed_seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def _learn(self, model: OnlineVerificationModel, batch, learned: Dict) -> int:
+        """partial_fit one batch of labelled projects and record them as learned"""
+        df, labels = self.labelled_frame(batch)
+        model.partial_fit(df, labels)
+        for project in batch:
+            learned[str(project["_id"])] = project.get("updatedAt")
+        return len(batch)
+
+def main():
+    parser = argparse.ArgumentParser(description='Online model updates from moderator decisions')
+    parser.add_argument('command', choices=['bootstrap', 'update'], help='Bootstrap from CSV or apply new labels')
+    parser.add_argument('--csv', default='communityfund_projects.csv', help='Training CSV for bootstrap')
+    parser.add_argument('--batch-size', type=int, default=256, help='Labelled projects per partial_fit')
+    parser.add_argument('--loop', action='store_true', help='Keep applying updates every --interval seconds')
+    parser.add_argument('--interval', type=float, default=60, help='Seconds between updates with --loop')
+
+    args = parser.parse_args()
+
+    from auto_verification_service import MongoDBProjectVerifier
+    from mongo_connection import connection_manager
+
+    verifier = MongoDBProjectVerifier()
+    learner = OnlineLearner(verifier, batch_size=args.batch_size)
+    try:
+        if args.command == 'bootstrap':
+            learner.bootstrap(args.csv)
+        else:
+            while True:
+                logger.info(f"Online update: {learner.update()}")
+                if not args.loop:
+                    break
+                time.sleep(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Online learner stopped")
+    finally:
+        verifier.close_connection()
+        connection_manager.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# ai_service/profiling.py
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PROFILE_NAME_PATTERN = re.compile(r'^[A-Za-z0-9_.-]+\.prof$')
+
+# Keys pstats.Stats.sort_stats accepts, including the legacy abbreviations
+PROFILE_SORT_KEYS = frozenset(pstats.Stats.sort_arg_dict_default)
+
+
+class RunProfiler:
+    """
+    Opt-in cProfile capture for individual verification runs.
+
+    A run is profiled when the caller asks for it explicitly or when it is
+    picked by the sampling rate. Unprofiled runs only pay for one random()
+    call, and nothing at all when sampling is disabled.
+    """
+
+    def __init__(self, profile_dir=None, sample_rate=None, max_profiles=None):
+        self.profile_dir = Path(profile_dir or os.getenv('PROFILE_DIR', 'profiles'))
+        self.sample_rate = float(sample_rate if sample_rate is not None else os.getenv('PROFILE_SAMPLE_RATE', 0))
+        self.max_profiles = int(max_profiles if max_profiles is not None else os.getenv('PROFILE_MAX_FILES', 50))
+        # cProfile can only have one active profiler per interpreter
+        self._lock = threading.Lock()
+
+    def should_profile(self, requested: bool = False) -> bool:
+        """Decide whether the current run gets profiled"""
+        if requested:
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    @contextmanager
+    def profile(self, label: str, requested: bool = False):
+        """
+        Profile the enclosed block if requested or sampled.
+
+        Yields a dict that receives the stored profile name under 'profile'
+        when a profile was captured, so callers can hand it back to clients.
+        An explicitly requested profile that cannot be taken because another
+        run is being profiled is reported under 'profile_skipped'.
+        """
+        info = {}
+        if not self.should_profile(requested):
+            yield info
+            return
+        if not self._lock.acquire(blocking=False):
+            if requested:
+                info['profile_skipped'] = "Another run is being profiled; retry for a profile"
+            yield info
+            return
+
+        profiler = cProfile.Profile()
+        started = time.perf_counter()
+        try:
+            profiler.enable()
+            try:
+                yield info
+            finally:
+                profiler.disable()
+            info['profile'] = self._store(profiler, label, time.perf_counter() - started)
+        finally:
+            self._lock.release()
+
+    def _store(self, profiler: cProfile.Profile, label: str, elapsed: float) -> Optional[str]:
+        """Dump profiler stats to disk and prune old profiles"""
+        try:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+            safe_label = re.sub(r'[^A-Za-z0-9_-]', '_', label)
+            name = f"{stamp}_{safe_label}.prof"
+            profiler.dump_stats(str(self.profile_dir / name))
+            logger.info(f"Stored profile {name} ({elapsed*1000:.1f} ms)")
+            self._prune()
+            return name
+        except Exception as e:
+            logger.error(f"Error storing profile: {e}")
+            return None
+
+    def _prune(self):
+        """Keep only the newest max_profiles files"""
+        profiles = sorted(self.profile_dir.glob('*.prof'))
+        for old in profiles[:-self.max_profiles] if self.max_profiles > 0 else []:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+
+    def list_profiles(self) -> List[Dict]:
+        """List stored profiles, newest first"""
+        if not self.profile_dir.exists():
+            return []
+        profiles = []
+        for path in sorted(self.profile_dir.glob('*.prof'), reverse=True):
+            stat = path.stat()
+            profiles.append({
+                'name': path.name,
+                'size_bytes': stat.st_size,
+                'created_at': datetime.fromtimestamp(stat.st_mtime, timezone.utc).isoformat()
+            })
+        return profiles
+
+    def profile_path(self, name: str) -> Optional[Path]:
+        """Resolve a stored profile name to its path, rejecting anything else"""
+        if not PROFILE_NAME_PATTERN.match(name):
+            return None
+        path = self.profile_dir / name
+        return path if path.is_file() else None
+
+    def summarize(self, name: str, limit: int = 30, sort_by: str = 'cumulative') -> Optional[str]:
+        """Render the top entries of a stored profile as text"""
+        if sort_by not in PROFILE_SORT_KEYS:
+            raise ValueError(f"Unknown profile sort key: {sort_by}")
+        path = self.profile_path(name)
+        if path is None:
+            return None
+        stream = io.StringIO()
+        stats = pstats.Stats(str(path), stream=stream)
+        stats.sort_stats(sort_by).print_stats(limit)
+        return stream.getvalue()
@@ -0,0 +1,90 @@
+# ai_service/project_columns.py
+import logging
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Fields computed server-side for the model and the note rules. Everything
+# else on the project document (raisedAmount, creator, image URLs, ...) stays
+# in MongoDB.
+FEATURE_PROJECTION = {
+    '_id': 1,
+    'title': {'$ifNull': ['$title', '']},
+    'description': {'$ifNull': ['$description', '']},
+    'category': {'$ifNull': ['$category', 'Other']},
+    'goalAmount': {'$ifNull': ['$goalAmount', 0]},
+    'goalAmount_log': {'$ln': {'$add': [{'$ifNull': ['$goalAmount', 1]}, 1]}},
+    'title_length': {'$strLenCP': {'$toString': {'$ifNull': ['$title', '']}}},
+    'description_length': {'$strLenCP': {'$toString': {'$ifNull': ['$description', '']}}},
+    'media_count': {'$size': {'$ifNull': ['$images', []]}},
+}
+
+NUMERIC_COLUMNS = {
+    'goalAmount': 'd',
+    'goalAmount_log': 'd',
+    'title_length': 'q',
+    'description_length': 'q',
+    'media_count': 'q',
+}
+
+
+def build_feature_pipeline(match: Dict, sort: Optional[List[Tuple[str, int]]] = None,
+                           limit: Optional[int] = None) -> List[Dict]:
+    """Aggregation pipeline returning only the projected feature fields"""
+    pipeline = [{'$match': match}]
+    if sort:
+        pipeline.append({'$sort': dict(sort)})
+    if limit:
+        pipeline.append({'$limit': int(limit)})
+    pipeline.append({'$project': FEATURE_PROJECTION})
+    return pipeline
+
+
+def fetch_project_columns(collection, match: Dict, preprocess_text: Callable[[str], str],
+                          sort: Optional[List[Tuple[str, int]]] = None, limit: Optional[int] = None,
+                          batch_size: int = 1000) -> pd.DataFrame:
+    """
+    Stream projected project documents into typed column arrays.
+
+    Numeric columns are filled into array.array buffers straight from the
+    cursor, and the frame is assembled column-wise, so there is no per-project
+    dict and no DataFrame-from-records step.
+    """
+    cursor = collection.aggregate(build_feature_pipeline(match, sort, limit), batchSize=batch_size)
+
+    ids = []
+    titles = []
+    descriptions = []
+    categories = []
+    combined_texts = []
+    numeric = {name: array(typecode) for name, typecode in NUMERIC_COLUMNS.items()}
+    appenders = [(doc_field, buffer.append) for doc_field, buffer in numeric.items()]
+
+    for doc in cursor:
+        title = doc['title']
+        description = doc['description']
+        ids.append(str(doc['_id']))
+        titles.append(title)
+        descriptions.append(description)
+        categories.append(doc['category'])
+        combined_texts.append(f"{preprocess_text(title)} {preprocess_text(description)}")
+        for doc_field, append in appenders:
+            append(doc[doc_field])
+
+    columns = {
+        '_id': np.array(ids, dtype=object),
+        'title': np.array(titles, dtype=object),
+        'description': np.array(descriptions, dtype=object),
+        'category': np.array(categories, dtype=object),
+        'combined_text': np.array(combined_texts, dtype=object),
+    }
+    for name, buffer in numeric.items():
+        columns[name] = np.frombuffer(buffer, dtype=np.float64 if buffer.typecode == 'd' else np.int64)
+
+    df = pd.DataFrame(columns, copy=False)
+    logger.info(f"Prepared {len(df)} projects for prediction (columnar)")
+    return df
@@ -0,0 +1,122 @@
+# ai_service/rollups.py
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+COUNTERS = ('scored', 'approved', 'rejected', 'manual_review', 'confidence_sum', 'batches')
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    """Start of the UTC hour or day containing moment"""
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    if granularity == 'hour':
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+class VerificationRollups:
+    """
+    Hourly and daily verification counters kept in their own collection.
+
+    Each written batch does one upserted $inc per granularity, so trend
+    queries read only the buckets in the requested window and their cost
+    does not depend on the size of the projects collection.
+    """
+
+    def __init__(self, collection, granularities: Sequence[str] = ('hour', 'day'), max_buckets: int = 5000):
+        self.collection = collection
+        self.granularities = list(granularities)
+        self.max_buckets = max_buckets
+
+    @classmethod
+    def from_env(cls, db) -> Optional['VerificationRollups']:
+        if os.getenv('ROLLUPS_ENABLED', 'True').lower() != 'true':
+            return None
+        try:
+            rollups = cls(db[os.getenv('ROLLUP_COLLECTION', 'verification_rollups')],
+                          max_buckets=int(os.getenv('ROLLUP_MAX_BUCKETS', 5000)))
+            rollups.collection.create_index([("granularity", 1), ("bucket", 1)])
+            return rollups
+        except Exception as e:
+            logger.error(f"Error setting up verification rollups: {e}")
+            return None
+
+    def record(self, approved: int = 0, rejected: int = 0, manual_review: int = 0,
+               confidences: Sequence[float] = (), when: datetime = None):
+        """
+        Add one written batch to the current hour and day buckets. confidences has
+        one entry per counted project: written decisions and first-time manual reviews.
+        """
+        when = when or datetime.now(timezone.utc)
+        increments = {
+            "scored": len(confidences),
+            "approved": approved,
+            "rejected": rejected,
+            "manual_review": manual_review,
+            "confidence_sum": float(sum(confidences)),
+            "batches": 1
+        }
+        for granularity in self.granularities:
+            bucket = bucket_start(when, granularity)
+            self.collection.update_one(
+                {"_id": f"{granularity}:{bucket.isoformat()}"},
+                {"$inc": increments,
+                 "$set": {"updatedAt": when},
+                 "$setOnInsert": {"granularity": granularity, "bucket": bucket}},
+                upsert=True
+            )
+
+    def trends(self, granularity: str = 'hour', start: datetime = None, end: datetime = None) -> Dict:
+        """Buckets from start's through end's, gaps filled with zeros, with derived rates"""
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {sorted(GRANULARITIES)}")
+        step = GRANULARITIES[granularity]
+        end = bucket_start(end or datetime.now(timezone.utc), granularity) + step
+        start = bucket_start(start or end - (48 * step if granularity == 'hour' else 30 * step), granularity)
+        if start >= end:
+            raise ValueError("start must be before end")
+        if (end - start) / step > self.max_buckets:
+            raise ValueError(f"Window spans more than {self.max_buckets} {granularity} buckets")
+
+        stored = {}
+        for doc in self.collection.find({"granularity": granularity, "bucket": {"$gte": start, "$lt": end}}):
+            stored[bucket_start(doc["bucket"], granularity)] = doc
+
+        buckets = []
+        bucket = start
+        while bucket < end:
+            doc = stored.get(bucket, {})
+            counts = {counter: doc.get(counter, 0) for counter in COUNTERS}
+            scored = counts["scored"]
+            buckets.append({
+                "bucket": bucket.isoformat(),
+                "scored": scored,
+                "approved": counts["approved"],
+                "rejected": counts["rejected"],
+                "manual_review": counts["manual_review"],
+                "batches": counts["batches"],
+                "mean_confidence": counts["confidence_sum"] / scored if scored else None,
+                "auto_verification_rate": (counts["approved"] + counts["rejected"]) / scored if scored else None
+            })
+            bucket += step
+
+        totals = {counter: sum(b[counter] for b in buckets) for counter in ('scored', 'approved', 'rejected', 'manual_review')}
+        confidence_sum = sum(doc.get("confidence_sum", 0) for doc in stored.values())
+        totals["mean_confidence"] = confidence_sum / totals["scored"] if totals["scored"] else None
+        totals["auto_verification_rate"] = ((totals["approved"] + totals["rejected"]) / totals["scored"]
+                                            if totals["scored"] else None)
+        return {
+            "granularity": granularity,
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "totals": totals,
+            "buckets": buckets
+        }
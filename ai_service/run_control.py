@@ -0,0 +1,239 @@
+# ai_service/run_control.py
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Hashable, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+logger = logging.getLogger(__name__)
+
+RUN_LOCK_ID = "verification_run"
+
+
+class RunLock:
+    """
+    Lease-based lock in MongoDB so only one full verification run is active
+    across the API, the scheduler and any other process.
+
+    The holder renews the lease in the background while it runs; if the
+    process dies the lease simply expires and the next caller takes over.
+    """
+
+    def __init__(self, collection, name: str = RUN_LOCK_ID, lease_seconds: float = 900):
+        self.collection = collection
+        self.name = name
+        self.lease_seconds = lease_seconds
+
+    def acquire(self, token: str, context: Dict = None) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            doc = self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"expiresAt": {"$lte": now}}, {"owner": token}]},
+                {"$set": {
+                    "owner": token,
+                    "host": socket.gethostname(),
+                    "pid": os.getpid(),
+                    "context": context or {},
+                    "acquiredAt": now,
+                    "expiresAt": now + timedelta(seconds=self.lease_seconds)
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+        except DuplicateKeyError:
+            # Lock document exists and is held by someone else
+            return False
+        return doc is not None and doc.get("owner") == token
+
+    def renew(self, token: str) -> bool:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds)
+        result = self.collection.update_one({"_id": self.name, "owner": token}, {"$set": {"expiresAt": expires_at}})
+        return result.matched_count > 0
+
+    def release(self, token: str):
+        self.collection.delete_one({"_id": self.name, "owner": token})
+
+    @contextmanager
+    def hold(self, wait_seconds: float = 0, poll_seconds: float = 1.0, context: Dict = None):
+        """
+        Yield True while holding the lock, or False if it could not be taken
+        within wait_seconds. The lease is renewed every third of its length.
+        """
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + wait_seconds
+        acquired = self.acquire(token, context)
+        while not acquired and time.monotonic() < deadline:
+            time.sleep(min(poll_seconds, max(0.0, deadline - time.monotonic())))
+            acquired = self.acquire(token, context)
+        if not acquired:
+            yield False
+            return
+
+        stop = threading.Event()
+
+        def keep_alive():
+            while not stop.wait(self.lease_seconds / 3):
+                try:
+                    if not self.renew(token):
+                        logger.warning(f"Lost the {self.name} lock lease")
+                        return
+                except Exception as e:
+                    logger.error(f"Error renewing {self.name} lock: {e}")
+
+        renewer = threading.Thread(target=keep_alive, daemon=True)
+        renewer.start()
+        try:
+            yield True
+        finally:
+            stop.set()
+            try:
+                self.release(token)
+            except Exception as e:
+                logger.error(f"Error releasing {self.name} lock: {e}")
+
+    def status(self) -> Dict:
+        """The current holder, or {'held': False}"""
+        doc = self.collection.find_one({"_id": self.name})
+        if not doc:
+            return {"held": False}
+        # PyMongo returns naive UTC datetimes unless the client is tz_aware
+        acquired_at, expires_at = (
+            value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+            for value in (doc["acquiredAt"], doc["expiresAt"])
+        )
+        if expires_at <= datetime.now(timezone.utc):
+            return {"held": False}
+        return {
+            "held": True,
+            "host": doc.get("host"),
+            "pid": doc.get("pid"),
+            "context": doc.get("context", {}),
+            "acquired_at": acquired_at.isoformat(),
+            "expires_at": expires_at.isoformat()
+        }
+
+
+class JoinLimitReached(Exception):
+    """Raised when an in-flight call already has max_joiners callers waiting on it"""
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.started_at = datetime.now(timezone.utc)
+        self.joiners = 0
+        self.waiting = 0
+
+
+class SingleFlight:
+    """
+    Collapses concurrent calls with the same key into one execution.
+    The first caller runs the function; callers arriving while it runs wait
+    for and share its result. Each waiting caller holds a thread, so at most
+    max_joiners may wait on one call; further callers get JoinLimitReached.
+    """
+
+    def __init__(self, max_joiners: int = None):
+        self.max_joiners = max_joiners
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def do(self, key: Hashable, fn: Callable, timeout: float = None) -> Tuple[object, bool]:
+        """Return (result, joined). Raises TimeoutError if a joined run outlasts timeout."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self._add_joiner(key, flight)
+
+        if leader:
+            try:
+                flight.result = fn()
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    del self._flights[key]
+                flight.done.set()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, False
+        return self._wait(key, flight, timeout), True
+
+    def join(self, key: Hashable, timeout: float = None) -> Tuple[bool, object]:
+        """Wait for an in-flight call with this key, returning (True, result), or (False, None) if there is none"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                return False, None
+            self._add_joiner(key, flight)
+        return True, self._wait(key, flight, timeout)
+
+    def _add_joiner(self, key: Hashable, flight: _Flight):
+        """Count a waiting caller; the caller holds self._lock"""
+        if self.max_joiners is not None and flight.waiting >= self.max_joiners:
+            raise JoinLimitReached(f"In-flight run {key} already has {flight.waiting} callers waiting")
+        flight.joiners += 1
+        flight.waiting += 1
+
+    def _wait(self, key: Hashable, flight: _Flight, timeout: float = None):
+        try:
+            finished = flight.done.wait(timeout)
+        finally:
+            with self._lock:
+                flight.waiting -= 1
+        if not finished:
+            raise TimeoutError(f"In-flight run {key} did not finish within {timeout}s")
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def status(self) -> Dict:
+        with self._lock:
+            return {
+                str(key): {"started_at": flight.started_at.isoformat(), "joiners": flight.joiners,
+                           "waiting": flight.waiting}
+                for key, flight in self._flights.items()
+            }
+
+
+class AdmissionLimiter:
+    """Non-blocking cap on concurrent requests to an expensive endpoint"""
+
+    def __init__(self, name: str, limit: int, retry_after: int = 5):
+        self.name = name
+        self.limit = limit
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(limit)
+        self._lock = threading.Lock()
+        self.stats = {'admitted': 0, 'rejected': 0, 'in_flight': 0}
+
+    def try_acquire(self) -> bool:
+        if not self._semaphore.acquire(blocking=False):
+            with self._lock:
+                self.stats['rejected'] += 1
+            return False
+        with self._lock:
+            self.stats['admitted'] += 1
+            self.stats['in_flight'] += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.stats['in_flight'] -= 1
+        self._semaphore.release()
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return dict(self.stats, limit=self.limit)
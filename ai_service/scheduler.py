@@ -1,41 +1,220 @@
 import schedule
 import time
+import os
+import socket
 import logging
-from auto_verification_service import MongoDBProjectVerifier
+import pymongo
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+from auto_verification_service import MongoDBProjectVerifier, claimable_filter
+from run_control import RunLock
+
+load_dotenv()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Named priority orders; SCHEDULER_PRIORITY may also be a custom
+# "field:asc,field:desc" list. _id is always appended as a tie-breaker.
+PRIORITY_ORDERS = {
+    'oldest': [("createdAt", pymongo.ASCENDING)],
+    'goal': [("goalAmount", pymongo.ASCENDING), ("createdAt", pymongo.ASCENDING)],
+}
+
+STATE_ID = "verification_scheduler"
+
+def parse_priority(priority):
+    """Turn a priority name or 'field:dir,...' spec into a sort list"""
+    if priority in PRIORITY_ORDERS:
+        sort = list(PRIORITY_ORDERS[priority])
+    else:
+        sort = []
+        for part in priority.split(','):
+            field, _, direction = part.strip().partition(':')
+            sort.append((field, pymongo.DESCENDING if direction.lower() == 'desc' else pymongo.ASCENDING))
+    if not any(field == "_id" for field, _ in sort):
+        sort.append(("_id", pymongo.ASCENDING))
+    return sort
+
+def keyset_filter(sort, last_key):
+    """Filter matching documents strictly after last_key in sort order"""
+    clauses = []
+    for i, (field, direction) in enumerate(sort):
+        clause = {prev_field: last_key.get(prev_field) for prev_field, _ in sort[:i]}
+        clause[field] = {"$gt" if direction == pymongo.ASCENDING else "$lt": last_key.get(field)}
+        clauses.append(clause)
+    return {"$or": clauses}
+
+class AdaptiveInterval:
+    """
+    Picks the delay until the next verification run from the backlog size
+    and the smoothed arrival rate of new projects. A deep queue runs again
+    after min_interval, an empty and quiet one waits max_interval, and
+    otherwise the run is timed for roughly target_batch projects without
+    letting pending projects wait longer than max_wait.
+    """
+
+    def __init__(self, min_interval=60, max_interval=3600, max_wait=1800, target_batch=200, smoothing=0.3):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_wait = max_wait
+        self.target_batch = target_batch
+        self.smoothing = smoothing
+        self.arrival_rate = 0.0  # projects per second
+
+    def observe_arrivals(self, arrivals, elapsed):
+        if elapsed > 0:
+            rate = arrivals / elapsed
+            self.arrival_rate = self.smoothing * rate + (1 - self.smoothing) * self.arrival_rate
+
+    def next_interval(self, backlog):
+        if backlog >= self.target_batch:
+            return self.min_interval
+        if self.arrival_rate > 0:
+            interval = (self.target_batch - backlog) / self.arrival_rate
+        else:
+            interval = self.max_interval
+        if backlog > 0:
+            interval = min(interval, self.max_wait)
+        return max(self.min_interval, min(self.max_interval, interval))
+
+class VerificationScheduler:
+    """Budgeted, priority-ordered verification runs that resume where the last run stopped"""
+
+    def __init__(self, confidence_threshold=0.75, priority=None, batch_size=None, time_budget=None):
+        self.confidence_threshold = confidence_threshold
+        self.sort = parse_priority(priority or os.getenv('SCHEDULER_PRIORITY', 'oldest'))
+        self.batch_size = batch_size or int(os.getenv('SCHEDULER_BATCH_SIZE', 100))
+        self.time_budget = time_budget or float(os.getenv('SCHEDULER_TIME_BUDGET', 300))
+        self.interval = AdaptiveInterval(
+            min_interval=float(os.getenv('SCHEDULER_MIN_INTERVAL', 60)),
+            max_interval=float(os.getenv('SCHEDULER_MAX_INTERVAL', 3600)),
+            max_wait=float(os.getenv('SCHEDULER_MAX_WAIT', 1800)),
+            target_batch=int(os.getenv('SCHEDULER_TARGET_BATCH', 200))
+        )
+        self.last_observed = None
+        self.owner = f"scheduler:{socket.gethostname()}:{os.getpid()}"
+
+    def _load_checkpoint(self, verifier):
+        state = verifier.db.scheduler_state.find_one({"_id": STATE_ID}) or {}
+        if state.get("sort") != [list(item) for item in self.sort]:
+            # Priority order changed, the old position is meaningless
+            return None
+        return state.get("last_key")
+
+    def _save_checkpoint(self, verifier, last_key):
+        verifier.db.scheduler_state.update_one(
+            {"_id": STATE_ID},
+            {"$set": {
+                "sort": [list(item) for item in self.sort],
+                "last_key": last_key,
+                "updatedAt": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    def run(self, verifier):
+        """Process pending projects in priority order until done or out of time"""
+        started = time.monotonic()
+        last_key = start_key = self._load_checkpoint(verifier)
+        totals = {"processed": 0, "approved": 0, "rejected": 0, "manual_review": 0, "batches": 0}
+        wrapped = last_key is None
+
+        while time.monotonic() - started < self.time_budget:
+            clauses = [keyset_filter(self.sort, last_key)] if last_key else []
+            if wrapped and start_key:
+                # Second pass from the top stops at the checkpoint this run started from
+                clauses.append({"$nor": [keyset_filter(self.sort, start_key)]})
+            extra_filter = {"$and": clauses} if clauses else None
+            # Grows or shrinks with MEMORY_BUDGET_MB once feature-matrix sizes are observed
+            limit = verifier.batch_size(self.batch_size)
+            # Lease the batch so workers running alongside skip it; only the sort keys are
+            # read here, the batch itself goes through the columnar projection when enabled
+            token, projects = verifier.claim_pending_projects(self.owner, sort=self.sort, limit=limit,
+                                                              extra_filter=extra_filter)
+            if not projects:
+                if wrapped:
+                    last_key = None
+                    break
+                # Reached the end of the order; start again from the top once
+                last_key = None
+                wrapped = True
+                continue
+
+            try:
+                df = verifier.load_project_frame({"lease.token": token}, sort=self.sort)
+                if not df.empty:
+                    result = verifier.verify_frame(df, self.confidence_threshold, dry_run=False, lease_token=token)
+                    totals["batches"] += 1
+                    for key in ("processed", "approved", "rejected", "manual_review"):
+                        totals[key] += result.get(key, 0)
+            finally:
+                verifier.release_claim(token)
+
+            last_doc = projects[-1]
+            last_key = {field: last_doc.get(field) for field, _ in self.sort}
+
+        self._save_checkpoint(verifier, last_key)
+        totals["elapsed_seconds"] = round(time.monotonic() - started, 2)
+        totals["budget_exhausted"] = last_key is not None
+        return totals
+
+    def plan_next_run(self, verifier):
+        """Observe backlog and arrivals and return seconds until the next run"""
+        now = datetime.now(timezone.utc)
+        projects = verifier.read_db.projects
+        # Projects left for manual review hold a recheck lease and are not backlog until it expires
+        backlog = projects.count_documents(claimable_filter(now))
+        if self.last_observed is not None:
+            arrivals = projects.count_documents({"createdAt": {"$gte": self.last_observed}})
+            self.interval.observe_arrivals(arrivals, (now - self.last_observed).total_seconds())
+        self.last_observed = now
+
+        interval = self.interval.next_interval(backlog)
+        logger.info(f"Backlog {backlog}, arrival rate {self.interval.arrival_rate * 3600:.1f}/h, "
+                    f"next verification in {interval:.0f}s")
+        return interval
+
+verification_scheduler = VerificationScheduler()
+
 def run_verification():
-    """Run verification job"""
+    """Run verification job; returns seconds until the next run"""
     try:
         logger.info("Starting scheduled verification...")
         verifier = MongoDBProjectVerifier()
-        
-        results = verifier.run_automated_verification(
-            confidence_threshold=0.75,
-            dry_run=False
-        )
-        
-        logger.info(f"Scheduled verification completed: {results}")
+
+        # Share the API's run lock so a dashboard-triggered run and this one never overlap
+        run_lock = RunLock(verifier.db.run_locks, lease_seconds=float(os.getenv('RUN_LOCK_LEASE_SECONDS', 900)))
+        with run_lock.hold(context={"source": "scheduler"}) as acquired:
+            if acquired:
+                results = verification_scheduler.run(verifier)
+                logger.info(f"Scheduled verification completed: {results}")
+            else:
+                logger.info(f"Another verification run is in progress, skipping: {run_lock.status()}")
+                verifier.close_connection()
+                return verification_scheduler.interval.min_interval
+
+        next_interval = verification_scheduler.plan_next_run(verifier)
         verifier.close_connection()
-        
+        return next_interval
+
     except Exception as e:
         logger.error(f"Scheduled verification failed: {e}")
+        return verification_scheduler.interval.max_wait
 
 def main():
     """Main scheduler function"""
-    # Schedule verification every 30 minutes
-    schedule.every(30).minutes.do(run_verification)
-    
     # Schedule daily stats report
     schedule.every().day.at("09:00").do(lambda: logger.info("Daily verification stats check"))
-    
-    logger.info("Scheduler started. Verification will run every 30 minutes.")
-    
+
+    logger.info("Scheduler started. Verification interval adapts to the pending backlog.")
+
+    next_run = time.monotonic()
     while True:
         schedule.run_pending()
-        time.sleep(60)  # Check every minute
+        if time.monotonic() >= next_run:
+            next_run = time.monotonic() + run_verification()
+        time.sleep(max(1, min(60, next_run - time.monotonic())))
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
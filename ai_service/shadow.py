@@ -0,0 +1,215 @@
+# ai_service/shadow.py
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def split_pipeline(model) -> Tuple[Optional[object], object]:
+    """(preprocessor, classifier) for preprocessor/classifier pipelines, else (None, model)"""
+    steps = getattr(model, 'named_steps', None)
+    if steps and 'preprocessor' in steps and 'classifier' in steps:
+        return steps['preprocessor'], steps['classifier']
+    return None, model
+
+
+def decision(approval: float, threshold: Optional[float]) -> str:
+    """The decision verify_frame would take for this approval probability"""
+    confidence = max(approval, 1 - approval)
+    if threshold is not None and confidence < threshold:
+        return 'manual_review'
+    return 'approved' if approval >= 0.5 else 'rejected'
+
+
+class SharedFeatures:
+    """
+    Per-batch cache of preprocessor outputs.
+
+    Models whose fitted preprocessors are identical (same joblib.hash
+    fingerprint) reuse one transformed matrix instead of re-running TF-IDF.
+    """
+
+    def __init__(self, X):
+        self.X = X
+        self._matrices = {}
+        self.transform_seconds = 0.0
+
+    def transform(self, preprocessor, fingerprint: str):
+        if fingerprint not in self._matrices:
+            started = time.perf_counter()
+            self._matrices[fingerprint] = preprocessor.transform(self.X)
+            self.transform_seconds += time.perf_counter() - started
+        return self._matrices[fingerprint]
+
+    def __len__(self):
+        return len(self._matrices)
+
+
+class ShadowModel:
+    """A candidate model scored alongside the primary without writing decisions"""
+
+    def __init__(self, name: str, model, path: str = None):
+        self.name = name
+        self.path = path
+        self.model = model
+        self.preprocessor, self.classifier = split_pipeline(model)
+        self.fingerprint = joblib.hash(self.preprocessor) if self.preprocessor is not None else None
+
+    def transform(self, features: SharedFeatures):
+        return features.transform(self.preprocessor, self.fingerprint)
+
+    def predict_proba(self, features: SharedFeatures) -> np.ndarray:
+        if self.preprocessor is None:
+            return self.model.predict_proba(features.X)
+        return self.classifier.predict_proba(self.transform(features))
+
+    def approval_probabilities(self, features: SharedFeatures) -> np.ndarray:
+        return self.predict_proba(features)[:, list(self.classifier.classes_).index(1)]
+
+
+class ShadowEvaluator:
+    """
+    Scores each batch with candidate models next to the primary.
+
+    Candidates never change project status. Per batch, agreement with the
+    primary (predicted class and thresholded decision), approval-probability
+    deltas and per-model latency are written to a separate collection in a
+    single insert_many, optionally together with per-project scores.
+    """
+
+    def __init__(self, candidates: List[ShadowModel], collection=None, per_project: bool = True):
+        self.candidates = candidates
+        self.collection = collection
+        self.per_project = per_project
+        self._primary = None
+        self._lock = threading.Lock()
+        self.totals = {
+            candidate.name: {'projects': 0, 'agreed': 0, 'decisions_agreed': 0, 'abs_delta': 0.0, 'seconds': 0.0}
+            for candidate in candidates
+        }
+
+    @classmethod
+    def from_env(cls, db) -> Optional['ShadowEvaluator']:
+        """Load candidates from the comma-separated SHADOW_MODEL_PATHS"""
+        paths = [path.strip() for path in os.getenv('SHADOW_MODEL_PATHS', '').split(',') if path.strip()]
+        if not paths:
+            return None
+        candidates = []
+        for path in paths:
+            try:
+                name = os.path.splitext(os.path.basename(path))[0]
+                candidates.append(ShadowModel(name, joblib.load(path), path))
+                logger.info(f"Shadow model {name} loaded from {path}")
+            except Exception as e:
+                logger.error(f"Error loading shadow model {path}: {e}")
+        if not candidates:
+            return None
+        collection = db[os.getenv('SHADOW_COLLECTION', 'shadow_evaluations')]
+        per_project = os.getenv('SHADOW_PER_PROJECT', 'True').lower() == 'true'
+        return cls(candidates, collection, per_project)
+
+    def primary(self, model) -> ShadowModel:
+        """Wrap the primary model, fingerprinting its preprocessor once per model"""
+        if self._primary is None or self._primary.model is not model:
+            self._primary = ShadowModel('primary', model)
+            shared = [c.name for c in self.candidates if c.fingerprint and c.fingerprint == self._primary.fingerprint]
+            if shared:
+                logger.info(f"Shadow models sharing the primary's features: {', '.join(shared)}")
+        return self._primary
+
+    def evaluate(self, features: SharedFeatures, project_ids: Sequence, primary_approval: np.ndarray,
+                 primary_seconds: float, primary_version: str = None, threshold: float = None) -> Dict:
+        """Score the candidates on an already prepared batch and record how they compare"""
+        batch_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        primary_approval = np.asarray(primary_approval, dtype=float)
+        primary_class = primary_approval >= 0.5
+        primary_decisions = [decision(p, threshold) for p in primary_approval]
+        fingerprint = self._primary.fingerprint if self._primary is not None else None
+
+        summary = {
+            "type": "batch",
+            "batchId": batch_id,
+            "createdAt": now,
+            "batchSize": len(primary_approval),
+            "threshold": threshold,
+            "primary": {"version": primary_version, "latencyMs": primary_seconds * 1000},
+            "candidates": []
+        }
+        scores = {}
+        for candidate in self.candidates:
+            try:
+                transform_before = features.transform_seconds
+                started = time.perf_counter()
+                approval = candidate.approval_probabilities(features)
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                logger.error(f"Error scoring shadow model {candidate.name}: {e}")
+                continue
+            scores[candidate.name] = approval
+            delta = approval - primary_approval
+            decisions = [decision(p, threshold) for p in approval]
+            agreed = int(np.sum((approval >= 0.5) == primary_class))
+            decisions_agreed = sum(a == b for a, b in zip(decisions, primary_decisions))
+            summary["candidates"].append({
+                "name": candidate.name,
+                "path": candidate.path,
+                "latencyMs": elapsed * 1000,
+                "transformMs": (features.transform_seconds - transform_before) * 1000,
+                "sharedFeatures": candidate.fingerprint is not None and candidate.fingerprint == fingerprint,
+                "agreement": agreed / len(approval) if len(approval) else None,
+                "decisionAgreement": decisions_agreed / len(approval) if len(approval) else None,
+                "meanAbsDelta": float(np.abs(delta).mean()) if len(delta) else 0.0,
+                "maxAbsDelta": float(np.abs(delta).max()) if len(delta) else 0.0,
+                "approvalRate": float(np.mean(approval >= 0.5)) if len(approval) else 0.0
+            })
+            with self._lock:
+                totals = self.totals[candidate.name]
+                totals['projects'] += len(approval)
+                totals['agreed'] += agreed
+                totals['decisions_agreed'] += decisions_agreed
+                totals['abs_delta'] += float(np.abs(delta).sum())
+                totals['seconds'] += elapsed
+
+        documents = [summary]
+        if self.per_project and scores:
+            for i, project_id in enumerate(project_ids):
+                documents.append({
+                    "type": "project",
+                    "batchId": batch_id,
+                    "createdAt": now,
+                    "projectId": str(project_id),
+                    "primary": {"approvalProbability": float(primary_approval[i]), "decision": primary_decisions[i]},
+                    "candidates": {
+                        name: {"approvalProbability": float(approval[i]), "decision": decision(approval[i], threshold)}
+                        for name, approval in scores.items()
+                    }
+                })
+        if self.collection is not None:
+            try:
+                self.collection.insert_many(documents, ordered=False)
+            except Exception as e:
+                logger.error(f"Error recording shadow evaluation: {e}")
+        return summary
+
+    def get_stats(self) -> Dict:
+        """Agreement, mean delta and latency per candidate since start-up"""
+        with self._lock:
+            return {
+                name: {
+                    'projects': totals['projects'],
+                    'agreement': totals['agreed'] / totals['projects'] if totals['projects'] else None,
+                    'decision_agreement': totals['decisions_agreed'] / totals['projects'] if totals['projects'] else None,
+                    'mean_abs_delta': totals['abs_delta'] / totals['projects'] if totals['projects'] else None,
+                    'mean_latency_ms_per_project': totals['seconds'] * 1000 / totals['projects'] if totals['projects'] else None
+                }
+                for name, totals in self.totals.items()
+            }
@@ -0,0 +1,48 @@
+import joblib
+import numpy as np
+import pandas as pd
+
+from category_router import FALLBACK_ROUTE, CategoryModelRouter
+
+
+class ConstantModel:
+    """Picklable stand-in that gives every row the same approval probability"""
+
+    classes_ = np.array([0, 1])
+
+    def __init__(self, approval):
+        self.approval = approval
+
+    def predict_proba(self, X):
+        return np.tile([1 - self.approval, self.approval], (len(X), 1))
+
+
+def make_router(tmp_path, fallback=True):
+    joblib.dump(ConstantModel(0.9), tmp_path / "category_arts.pkl")
+    manifest = {"classes": [0, 1], "categories": {"Arts": {"path": "category_arts.pkl"}}}
+    if fallback:
+        joblib.dump(ConstantModel(0.2), tmp_path / "category_fallback.pkl")
+        manifest["fallback"] = "category_fallback.pkl"
+    return CategoryModelRouter(str(tmp_path), manifest)
+
+
+def test_fallback_is_loaded_only_for_categories_without_a_model(tmp_path):
+    router = make_router(tmp_path)
+
+    probabilities, routes = router.predict_proba(pd.DataFrame({"category": ["Arts", "Arts"]}))
+    assert list(routes) == ["category:Arts"] * 2
+    assert not router.get_stats()["fallback_loaded"]
+
+    probabilities, routes = router.predict_proba(pd.DataFrame({"category": ["Arts", "Health"]}))
+    assert list(routes) == ["category:Arts", FALLBACK_ROUTE]
+    assert probabilities[:, 1].tolist() == [0.9, 0.2]
+    assert router.get_stats()["fallback_loaded"]
+
+
+def test_passed_fallback_model_is_used_without_a_manifest_fallback(tmp_path):
+    router = make_router(tmp_path, fallback=False)
+
+    probabilities, routes = router.predict_proba(pd.DataFrame({"category": ["Health"]}), ConstantModel(0.6))
+    assert list(routes) == [FALLBACK_ROUTE]
+    assert probabilities[0, 1] == 0.6
+    assert router.get_fallback() is None
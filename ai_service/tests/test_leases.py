@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from auto_verification_service import MongoDBProjectVerifier, claimable_filter
+from feature_memory import FeatureMemoryTracker
+
+
+def make_verifier(db, lease_seconds=300, recheck_seconds=1800, batch_size=500):
+    """Verifier wired to a mongomock database, without a model or NLTK data"""
+    verifier = MongoDBProjectVerifier.__new__(MongoDBProjectVerifier)
+    verifier.db = db
+    verifier.read_db = db
+    verifier.lease_seconds = lease_seconds
+    verifier.recheck_seconds = recheck_seconds
+    verifier.full_run_batch_size = batch_size
+    verifier.feature_memory = FeatureMemoryTracker()
+    verifier.columnar_preparation = False
+    verifier.lemmatizer = None
+    verifier.stop_words = set()
+    return verifier
+
+
+@pytest.fixture
+def db():
+    db = mongomock.MongoClient().crowdfunding
+    start = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    db.projects.insert_many([{
+        "title": f"Project {i}",
+        "description": "A community project with a clear plan and budget",
+        "category": "Community",
+        "goalAmount": 1000.0,
+        "images": [],
+        "status": "pending",
+        "createdAt": start + timedelta(minutes=i)
+    } for i in range(7)])
+    return db
+
+
+def claimable_ids(db):
+    return {doc["_id"] for doc in db.projects.find(claimable_filter(datetime.now(timezone.utc)))}
+
+
+def test_concurrent_claims_do_not_overlap(db):
+    verifier = make_verifier(db)
+    token_a, claimed_a = verifier.claim_pending_projects("a", limit=4)
+    token_b, claimed_b = verifier.claim_pending_projects("b", limit=4)
+
+    leased_a = {doc["_id"] for doc in db.projects.find({"lease.token": token_a})}
+    leased_b = {doc["_id"] for doc in db.projects.find({"lease.token": token_b})}
+    assert len(leased_a) == 4 and len(leased_b) == 3
+    assert not leased_a & leased_b
+    assert verifier.claim_pending_projects("c") == (None, [])
+
+
+def test_expired_lease_is_claimable_again(db):
+    verifier = make_verifier(db)
+    token, _ = verifier.claim_pending_projects("crashed", limit=2)
+    db.projects.update_many({"lease.token": token},
+                            {"$set": {"lease.expiresAt": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+
+    new_token, claimed = verifier.claim_pending_projects("b", limit=2)
+    assert new_token != token
+    assert db.projects.count_documents({"lease.token": new_token}) == 2
+    assert db.projects.count_documents({"lease.token": token}) == 0
+
+
+def test_release_defers_recheck_of_undecided_projects(db):
+    verifier = make_verifier(db)
+    token, _ = verifier.claim_pending_projects("a", limit=3)
+    verifier.release_claim(token)
+
+    deferred = list(db.projects.find({"lease.owner": None, "lease.expiresAt": {"$gt": datetime.now(timezone.utc)}}))
+    assert len(deferred) == 3
+    assert not claimable_ids(db) & {doc["_id"] for doc in deferred}
+
+    token, _ = verifier.claim_pending_projects("b", limit=3)
+    verifier.release_claim(token, recheck_seconds=0)
+    assert len(claimable_ids(db)) == 4
+
+
+def test_decision_write_requires_lease_and_pending_status(db):
+    verifier = make_verifier(db)
+    token, claimed = verifier.claim_pending_projects("a", limit=2)
+    first, second = (str(doc["_id"]) for doc in claimed)
+
+    assert not verifier.update_project_status(first, 1, 0.9, "notes", lease_token="someone-else")
+    assert verifier.update_project_status(first, 1, 0.9, "notes", lease_token=token)
+    decided = db.projects.find_one({"_id": claimed[0]["_id"]})
+    assert decided["status"] == "approved" and "lease" not in decided
+
+    # A moderator decides while the lease is held: the leased write must not overwrite it
+    db.projects.update_one({"_id": claimed[1]["_id"]}, {"$set": {"status": "rejected", "validatedBy": "moderator"}})
+    assert not verifier.update_project_status(second, 1, 0.9, "notes", lease_token=token)
+    assert not verifier.update_project_status(second, 1, 0.9, "notes")
+    assert db.projects.find_one({"_id": claimed[1]["_id"]})["status"] == "rejected"
+
+
+def test_claim_project_refuses_live_leases_and_decided_projects(db):
+    verifier = make_verifier(db)
+    _, claimed = verifier.claim_pending_projects("worker", limit=1)
+    leased_id = str(claimed[0]["_id"])
+
+    token, refusal = verifier.claim_project(leased_id, "api")
+    assert token is None and refusal["lease_owner"] == "worker"
+
+    free = db.projects.find_one({"lease": {"$exists": False}})
+    token, refusal = verifier.claim_project(str(free["_id"]), "api")
+    assert token is not None and refusal is None
+    assert verifier.update_project_status(str(free["_id"]), 0, 0.9, "notes", lease_token=token)
+
+    token, refusal = verifier.claim_project(str(free["_id"]), "api")
+    assert token is None and refusal["status"] == "rejected"
+
+
+def test_full_run_leases_one_batch_at_a_time(db):
+    verifier = make_verifier(db, batch_size=3)
+    _, worker_claimed = verifier.claim_pending_projects("worker", limit=1)
+    batches = []
+
+    def verify_frame(df, confidence_threshold, dry_run, lease_token=None):
+        # Only this batch is leased to the run; the rest of the backlog stays claimable
+        assert db.projects.count_documents({"lease.owner": {"$regex": "^run:"}}) == len(df)
+        batches.append(list(df["_id"]))
+        decided = 0
+        for i, project_id in enumerate(df["_id"]):
+            if i % 2 == 0:
+                decided += verifier.update_project_status(project_id, 1, 0.9, "notes", lease_token=lease_token)
+        return {"processed": decided, "approved": decided, "rejected": 0,
+                "manual_review": len(df) - decided, "projects": []}
+
+    verifier.verify_frame = verify_frame
+    result = verifier.run_automated_verification()
+
+    assert [len(batch) for batch in batches] == [3, 3]
+    assert str(worker_claimed[0]["_id"]) not in {project_id for batch in batches for project_id in batch}
+    assert result["batches"] == 2
+    assert result["approved"] == 4 and result["manual_review"] == 2
+    # Undecided projects wait out the recheck window instead of staying leased to the run
+    assert db.projects.count_documents({"lease.owner": {"$regex": "^run:"}}) == 0
+    assert db.projects.count_documents({"status": "pending", "lease.owner": None,
+                                        "lease.expiresAt": {"$gt": datetime.now(timezone.utc)}}) == 2
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+from online_learning import OnlineLearner
+from test_leases import make_verifier
+
+START = datetime(2025, 1, 1)
+
+
+def decided(i, status="approved", minutes=None):
+    return {
+        "title": f"Project {i}",
+        "description": "A community project with a clear plan and budget",
+        "category": "Community",
+        "goalAmount": 1000.0,
+        "images": [],
+        "status": status,
+        "validatedBy": "admin",
+        "updatedAt": START + timedelta(minutes=i if minutes is None else minutes)
+    }
+
+
+@pytest.fixture
+def learner():
+    client = mongomock.MongoClient()
+    verifier = make_verifier(client.crowdfunding)
+    # A secondary that has not caught up; labels must come from the primary
+    verifier.read_db = client.lagging_secondary
+    verifier.db.projects.insert_many([decided(i, "approved" if i % 2 else "rejected") for i in range(6)])
+    return OnlineLearner(verifier, batch_size=4)
+
+
+def test_late_commits_inside_the_overlap_window_are_learned_once(learner):
+    assert learner.update()["consumed"] == 6
+    watermark = learner.db.model_registry.find_one({"_id": learner.name})["watermark"]
+
+    # Committed after the update, but stamped before the watermark
+    learner.db.projects.insert_one(decided(6, minutes=2))
+    assert learner.update()["consumed"] == 1
+    assert learner.db.model_registry.find_one({"_id": learner.name})["watermark"] == watermark
+    assert learner.update()["consumed"] == 0
+
+
+def test_redecided_projects_are_learned_again(learner):
+    learner.update()
+    project = learner.db.projects.find_one({"title": "Project 5"})
+    learner.db.projects.update_one({"_id": project["_id"]},
+                                   {"$set": {"status": "rejected", "updatedAt": START + timedelta(minutes=10)}})
+    assert learner.update()["consumed"] == 1
+
+
+def test_publish_keeps_the_last_versions(learner):
+    learner.versions_to_keep = 2
+    learner.update()
+    for i in range(6, 9):
+        learner.db.projects.insert_one(decided(i, minutes=20 + i))
+        learner.update()
+
+    versions = sorted(doc["version"] for doc in learner.db.model_versions.find({"name": learner.name}))
+    assert versions == [3, 4]
+    assert learner.db.model_registry.find_one({"_id": learner.name})["version"] == 4
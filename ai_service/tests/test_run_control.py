@@ -0,0 +1,64 @@
+import threading
+import time
+
+import pytest
+
+from run_control import JoinLimitReached, SingleFlight
+
+
+def start_leader(flight, key, release):
+    """Run a leader call that blocks until release is set"""
+    results = []
+    thread = threading.Thread(target=lambda: results.append(flight.do(key, lambda: release.wait(5) and "done")))
+    thread.start()
+    while key not in flight.status():
+        time.sleep(0.01)
+    return thread, results
+
+
+def test_joiners_share_the_leader_result():
+    flight, release = SingleFlight(), threading.Event()
+    leader, results = start_leader(flight, "k", release)
+    joiner = threading.Thread(target=lambda: results.append(flight.join("k")))
+    joiner.start()
+    while flight.status()["k"]["waiting"] < 1:
+        time.sleep(0.01)
+    release.set()
+    leader.join()
+    joiner.join()
+
+    assert sorted(results, key=str) == [("done", False), (True, "done")]
+    assert flight.join("k") == (False, None)
+
+
+def test_joiners_beyond_the_cap_are_refused():
+    flight, release = SingleFlight(max_joiners=1), threading.Event()
+    leader, results = start_leader(flight, "k", release)
+    joiner = threading.Thread(target=lambda: results.append(flight.join("k")))
+    joiner.start()
+    while flight.status()["k"]["waiting"] < 1:
+        time.sleep(0.01)
+
+    with pytest.raises(JoinLimitReached):
+        flight.join("k")
+    with pytest.raises(JoinLimitReached):
+        flight.do("k", lambda: "second run")
+    # Other keys are not affected by the cap
+    assert flight.do("other", lambda: "other run") == ("other run", False)
+
+    release.set()
+    leader.join()
+    joiner.join()
+    assert (True, "done") in results
+
+
+def test_timed_out_joiners_free_their_slot():
+    flight, release = SingleFlight(max_joiners=1), threading.Event()
+    leader, _ = start_leader(flight, "k", release)
+
+    with pytest.raises(TimeoutError):
+        flight.join("k", timeout=0.05)
+    assert flight.status()["k"]["waiting"] == 0
+
+    release.set()
+    leader.join()
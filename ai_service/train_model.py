@@ -5,11 +5,18 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
 from sklearn.metrics import classification_report, confusion_matrix
-from sklearn.preprocessing import OneHotEncoder
+from sklearn.preprocessing import OneHotEncoder, MaxAbsScaler, FunctionTransformer
+from feature_memory import describe_matrix
 import matplotlib.pyplot as plt
 import seaborn as sns
 import re
+import os
+import json
+import time
+import argparse
+from datetime import datetime, timezone
 import nltk
 from nltk.corpus import stopwords
 from nltk.stem import WordNetLemmatizer
@@ -92,7 +99,34 @@ def create_features(df):
     
     return df
 
-def train_model(df):
+def build_preprocessor(low_memory=False, max_features=5000):
+    """
+    Feature pipeline shared by the forest and the cascade's linear tier.
+    With low_memory every block is float32 and the output always stays sparse
+    (sparse_threshold=1.0), so the text block is never densified and the forest
+    needs no float32 copy of the matrix.
+    """
+    if not low_memory:
+        return ColumnTransformer(
+            transformers=[
+                ('text', TfidfVectorizer(max_features=max_features, ngram_range=(1, 2)), 'combined_text'),
+                ('cat', OneHotEncoder(handle_unknown='ignore'), ['category']),
+                ('num', 'passthrough', ['goalAmount_log', 'title_length', 'description_length'])
+            ]
+        )
+    
+    return ColumnTransformer(
+        transformers=[
+            ('text', TfidfVectorizer(max_features=max_features, ngram_range=(1, 2), dtype=np.float32), 'combined_text'),
+            ('cat', OneHotEncoder(handle_unknown='ignore', dtype=np.float32), ['category']),
+            # np.asarray keeps the pickled model free of references to this module
+            ('num', FunctionTransformer(np.asarray, kw_args={'dtype': np.float32}, feature_names_out='one-to-one'),
+             ['goalAmount_log', 'title_length', 'description_length'])
+        ],
+        sparse_threshold=1.0
+    )
+
+def train_model(df, low_memory=False):
     """
     Train the classification model
     """
@@ -105,13 +139,7 @@ def train_model(df):
     )
     
     # Create preprocessing pipeline
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('text', TfidfVectorizer(max_features=5000, ngram_range=(1, 2)), 'combined_text'),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), ['category']),
-            ('num', 'passthrough', ['goalAmount_log', 'title_length', 'description_length'])
-        ]
-    )
+    preprocessor = build_preprocessor(low_memory)
     
     # Create the model pipeline
     model = Pipeline([
@@ -126,6 +154,10 @@ def train_model(df):
     # Train the model
     model.fit(X_train, y_train)
     
+    # Train the cheap linear tier on the same fitted features
+    linear = train_linear_tier(model, X_train, y_train)
+    print(f"Training feature matrix: {describe_matrix(model.named_steps['preprocessor'].transform(X_train))}")
+    
     # Make predictions
     y_pred = model.predict(X_test)
     
@@ -142,7 +174,126 @@ def train_model(df):
     plt.xlabel('Predicted Label')
     plt.show()
     
-    return model, X_test, y_test, y_pred
+    return model, linear, X_test, y_test, y_pred
+
+def train_linear_tier(model, X_train, y_train):
+    """
+    Train the sparse linear model used as the first cascade tier.
+    It reuses the forest pipeline's fitted preprocessor so both tiers
+    score the same feature matrix at inference time.
+    """
+    Xt_train = model.named_steps['preprocessor'].transform(X_train)
+    
+    linear = Pipeline([
+        ('scale', MaxAbsScaler()),  # keeps the matrix sparse
+        ('classifier', LogisticRegression(
+            solver='liblinear',
+            class_weight='balanced',
+            max_iter=1000
+        ))
+    ])
+    linear.fit(Xt_train, y_train)
+    return linear
+
+def evaluate_cascade(model, linear, X_test, band_low=0.25, band_high=0.75, repeats=20):
+    """
+    Compare cascade decisions and throughput against forest-only scoring
+    """
+    from cascade import CascadeScorer
+    
+    scorer = CascadeScorer(model, linear, band_low=band_low, band_high=band_high, audit_rate=0.0)
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        forest_probabilities = model.predict_proba(X_test)
+    forest_time = (time.perf_counter() - start) / repeats
+    
+    start = time.perf_counter()
+    for _ in range(repeats):
+        cascade_probabilities, tiers = scorer.predict_proba(X_test)
+    cascade_time = (time.perf_counter() - start) / repeats
+    
+    agreement = np.mean(forest_probabilities.argmax(axis=1) == cascade_probabilities.argmax(axis=1))
+    escalation_rate = np.mean(tiers == 'forest')
+    
+    print("Cascade Evaluation:")
+    print(f"Uncertainty band: [{band_low}, {band_high}]")
+    print(f"Escalated to forest: {escalation_rate*100:.1f}%")
+    print(f"Agreement with forest-only decisions: {agreement*100:.1f}%")
+    print(f"Forest-only: {forest_time*1000:.2f} ms/batch, cascade: {cascade_time*1000:.2f} ms/batch "
+          f"({forest_time / cascade_time:.1f}x)")
+    
+    return {
+        'agreement': float(agreement),
+        'escalation_rate': float(escalation_rate),
+        'speedup': float(forest_time / cascade_time)
+    }
+
+def category_slug(category):
+    return re.sub(r'[^a-z0-9]+', '_', str(category).lower()).strip('_') or 'other'
+
+def train_compact_model(X, y, low_memory=False):
+    """Small vocabulary, 50-tree pipeline used for category models and their fallback"""
+    model = Pipeline([
+        ('preprocessor', build_preprocessor(low_memory, max_features=1000)),
+        ('classifier', RandomForestClassifier(
+            n_estimators=50,
+            random_state=42,
+            class_weight='balanced'
+        ))
+    ])
+    return model.fit(X, y)
+
+def train_category_models(df, output_dir='models', min_samples=20, low_memory=False):
+    """
+    Train one compact model per category with enough labelled projects and
+    write a manifest for the verifier's category router. Categories that are
+    too small or have a single class use a compact fallback trained on all
+    projects, so routed verifiers never need the global forest in memory.
+    """
+    import joblib
+    
+    os.makedirs(output_dir, exist_ok=True)
+    features = ['combined_text', 'category', 'goalAmount_log', 'title_length', 'description_length']
+    
+    fallback = train_compact_model(df[features], df['verified_status'], low_memory)
+    joblib.dump(fallback, os.path.join(output_dir, 'category_fallback.pkl'))
+    manifest = {
+        "fallback": "category_fallback.pkl",
+        "classes": [int(c) for c in fallback.classes_],
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "categories": {}
+    }
+    print(f"Compact fallback model saved to {os.path.join(output_dir, 'category_fallback.pkl')}")
+    
+    for category, group in df.groupby('category'):
+        counts = group['verified_status'].value_counts()
+        if len(group) < min_samples or len(counts) < 2:
+            print(f"Category '{category}': {len(group)} samples, using the fallback model")
+            continue
+        
+        X, y = group[features], group['verified_status']
+        # Hold out a slice for a quick check when every class has enough samples
+        if counts.min() >= 5:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+        else:
+            X_train, X_test, y_train, y_test = X, None, y, None
+        
+        model = train_compact_model(X_train, y_train, low_memory)
+        
+        filename = f"category_{category_slug(category)}.pkl"
+        joblib.dump(model, os.path.join(output_dir, filename))
+        entry = {"path": filename, "samples": int(len(group))}
+        if X_test is not None:
+            entry["holdout_accuracy"] = float((model.predict(X_test) == y_test).mean())
+        manifest["categories"][str(category)] = entry
+        print(f"Category '{category}': {len(group)} samples, saved {filename} {entry.get('holdout_accuracy', '')}")
+    
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Category manifest saved to {os.path.join(output_dir, 'manifest.json')} "
+          f"({len(manifest['categories'])} category models)")
+    return manifest
 
 def analyze_feature_importance(model, X):
     """
@@ -189,6 +340,16 @@ def main():
     """
     Main function to run the entire training pipeline
     """
+    parser = argparse.ArgumentParser(description='Train the project verification model')
+    parser.add_argument('--low-memory', action='store_true',
+                        help='float32 sparse feature matrices end to end')
+    parser.add_argument('--per-category', action='store_true',
+                        help='Also train one compact model per category, plus a compact fallback')
+    parser.add_argument('--models-dir', default='models', help='Output directory for per-category models')
+    parser.add_argument('--min-category-samples', type=int, default=20,
+                        help='Smallest category that gets its own model')
+    args = parser.parse_args()
+    
     # Load and preprocess the data
     file_path = 'communityfund_projects.csv'  # Update with your CSV path
     df = load_and_preprocess_data(file_path)
@@ -197,7 +358,10 @@ def main():
     df = create_features(df)
     
     # Train the model
-    model, X_test, y_test, y_pred = train_model(df)
+    model, linear, X_test, y_test, y_pred = train_model(df, low_memory=args.low_memory)
+    
+    # Measure how the linear-first cascade compares with the forest
+    evaluate_cascade(model, linear, X_test)
     
     # Analyze feature importance
     feature_importance_df = analyze_feature_importance(model, X_test)
@@ -206,6 +370,12 @@ def main():
     import joblib
     joblib.dump(model, 'project_verification_model.pkl')
     print("Model saved as 'project_verification_model.pkl'")
+    joblib.dump(linear, 'project_verification_linear.pkl')
+    print("Cascade linear tier saved as 'project_verification_linear.pkl'")
+    
+    if args.per_category:
+        train_category_models(df, args.models_dir, min_samples=args.min_category_samples,
+                              low_memory=args.low_memory)
     
     return model
 
@@ -1,11 +1,19 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
 from flask_cors import CORS
 import logging
 import json
+import socket
+import time
+from functools import wraps
 from auto_verification_service import MongoDBProjectVerifier
+from profiling import PROFILE_SORT_KEYS, RunProfiler
+from mongo_connection import connection_manager
+from online_learning import OnlineLearner
+from run_control import AdmissionLimiter, JoinLimitReached, RunLock, SingleFlight
 import os
 from dotenv import load_dotenv
 from bson import ObjectId
+from datetime import datetime
 
 load_dotenv()
 
@@ -19,6 +27,74 @@ logger = logging.getLogger(__name__)
 # Initialize verifier
 verifier = None
 
+# Opt-in run profiling (per request or sampled via PROFILE_SAMPLE_RATE)
+profiler = RunProfiler()
+
+# Full runs are single-flight: identical concurrent triggers share one run, and a
+# MongoDB lease lock keeps runs from other processes (e.g. the scheduler) apart.
+# Each joiner parks a request thread, so VERIFY_MAX_JOINERS caps them per run.
+verify_flight = SingleFlight(max_joiners=int(os.getenv('VERIFY_MAX_JOINERS', 8)))
+run_lock = None
+VERIFY_JOIN_TIMEOUT = float(os.getenv('VERIFY_JOIN_TIMEOUT', 600))
+VERIFY_QUEUE_TIMEOUT = float(os.getenv('VERIFY_QUEUE_TIMEOUT', 300))
+
+# Admission limits for expensive endpoints; excess requests get 503 + Retry-After
+RETRY_AFTER_SECONDS = int(os.getenv('ADMISSION_RETRY_AFTER', 5))
+verify_admission = AdmissionLimiter('verify', int(os.getenv('ADMISSION_VERIFY_LIMIT', 4)), RETRY_AFTER_SECONDS)
+project_admission = AdmissionLimiter('verify_project', int(os.getenv('ADMISSION_PROJECT_LIMIT', 16)),
+                                     RETRY_AFTER_SECONDS)
+
+def is_truthy(value):
+    return str(value).lower() in ['1', 'true', 'yes', 'on']
+
+def profile_requested(data=None):
+    """Check the JSON body and query string for a profiling request"""
+    if data and is_truthy(data.get('profile', False)):
+        return True
+    return is_truthy(request.args.get('profile', False))
+
+def require_admin_token(f):
+    """Guard admin endpoints: refused unless ADMIN_TOKEN is configured and sent"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        admin_token = os.getenv('ADMIN_TOKEN')
+        if not admin_token:
+            return jsonify({"error": "ADMIN_TOKEN is not configured"}), 403
+        if request.headers.get('X-Admin-Token') != admin_token:
+            return jsonify({"error": "Unauthorized"}), 401
+        return f(*args, **kwargs)
+    return decorated
+
+def overloaded(limiter):
+    """503 response with Retry-After for a request the limiter turned away"""
+    response = jsonify({
+        "error": "Service overloaded, retry later",
+        "endpoint": limiter.name,
+        "retry_after": limiter.retry_after
+    })
+    response.headers['Retry-After'] = str(limiter.retry_after)
+    return response, 503
+
+def admission_limited(limiter):
+    """Reject requests beyond the limiter's concurrency with 503 and Retry-After"""
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            if not limiter.try_acquire():
+                return overloaded(limiter)
+            try:
+                return f(*args, **kwargs)
+            finally:
+                limiter.release()
+        return decorated
+    return decorator
+
+def get_run_lock():
+    global run_lock
+    if run_lock is None:
+        run_lock = RunLock(get_verifier().db.run_locks, lease_seconds=float(os.getenv('RUN_LOCK_LEASE_SECONDS', 900)))
+    return run_lock
+
 def get_verifier():
     global verifier
     if verifier is None:
@@ -31,7 +107,8 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "service": "AI Project Verification Service",
-        "model_loaded": get_verifier().model is not None
+        "model_loaded": get_verifier().model is not None or get_verifier().category_router is not None,
+        "model_version": get_verifier().model_version
     })
 
 @app.route('/stats', methods=['GET'])
@@ -44,29 +121,133 @@ def get_stats():
         logger.error(f"Error getting stats: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/stats/trends', methods=['GET'])
+def get_trends():
+    """Hourly or daily verification trends from the rollup collection"""
+    try:
+        start = request.args.get('start')
+        end = request.args.get('end')
+        trends = get_verifier().get_verification_trends(
+            granularity=request.args.get('granularity', 'hour'),
+            start=datetime.fromisoformat(start) if start else None,
+            end=datetime.fromisoformat(end) if end else None
+        )
+        return jsonify(trends)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error getting trends: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/verify', methods=['POST'])
 def run_verification():
-    """Run automated verification"""
+    """
+    Run automated verification.
+    Concurrent calls with the same parameters join the in-flight run; only calls
+    starting a new run count against ADMISSION_VERIFY_LIMIT, and beyond
+    VERIFY_MAX_JOINERS waiting joiners the call gets 503. While another
+    process holds the run lock the call returns 409, or with "wait": true queues for
+    up to VERIFY_QUEUE_TIMEOUT seconds.
+    """
     try:
         data = request.get_json() or {}
         
         confidence_threshold = data.get('confidence_threshold', 0.75)
         dry_run = data.get('dry_run', False)
+        wait = is_truthy(data.get('wait', False))
         
-        results = get_verifier().run_automated_verification(
-            confidence_threshold=confidence_threshold,
-            dry_run=dry_run
-        )
+        key = f"threshold={confidence_threshold},dry_run={dry_run}"
+        try:
+            # Joining an in-flight run only holds a thread, so it is capped separately from admission
+            joined, results = verify_flight.join(key, timeout=VERIFY_JOIN_TIMEOUT)
+            if not joined:
+                if not verify_admission.try_acquire():
+                    return overloaded(verify_admission)
+                try:
+                    results, joined = verify_flight.do(
+                        key,
+                        lambda: _run_full_verification(confidence_threshold, dry_run, wait, profile_requested(data)),
+                        timeout=VERIFY_JOIN_TIMEOUT
+                    )
+                finally:
+                    verify_admission.release()
+        except JoinLimitReached:
+            response = jsonify({
+                "status": "running",
+                "error": "Too many callers waiting on the in-flight run, retry later",
+                "in_flight": verify_flight.status().get(key)
+            })
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response, 503
+        except TimeoutError:
+            response = jsonify({"status": "running", "error": "Verification run still in progress"})
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response, 503
         
+        results = dict(results, joined=joined)
+        if results.get('status') == 'busy':
+            response = jsonify(results)
+            response.headers['Retry-After'] = str(RETRY_AFTER_SECONDS)
+            return response, 409
         return jsonify(results)
         
     except Exception as e:
         logger.error(f"Error in verification: {e}")
         return jsonify({"error": str(e)}), 500
 
+def _run_full_verification(confidence_threshold, dry_run, wait, profile):
+    """Run one full pass under the cross-process run lock"""
+    lock = get_run_lock()
+    context = {"source": "api", "confidence_threshold": confidence_threshold, "dry_run": dry_run}
+    with lock.hold(wait_seconds=VERIFY_QUEUE_TIMEOUT if wait else 0, context=context) as acquired:
+        if not acquired:
+            return {"status": "busy", "message": "Another verification run is in progress", "lock": lock.status()}
+        
+        with profiler.profile('verify', requested=profile) as profile_info:
+            results = get_verifier().run_automated_verification(
+                confidence_threshold=confidence_threshold,
+                dry_run=dry_run
+            )
+        
+        if profile_info.get('profile'):
+            results['profile'] = profile_info['profile']
+        if profile_info.get('profile_skipped'):
+            results['profile_skipped'] = profile_info['profile_skipped']
+        
+        return results
+
+@app.route('/verify/status', methods=['GET'])
+def verification_status():
+    """In-flight runs, the cross-process run lock and admission counters"""
+    try:
+        return jsonify({
+            "in_flight": verify_flight.status(),
+            "lock": get_run_lock().status(),
+            "admission": {
+                "verify": verify_admission.get_stats(),
+                "verify_project": project_admission.get_stats()
+            }
+        })
+    except Exception as e:
+        logger.error(f"Error getting verification status: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/verify/project/<project_id>', methods=['POST'])
+@admission_limited(project_admission)
 def verify_single_project(project_id):
     """Verify a single project by ID"""
+    data = request.get_json(silent=True) or {}
+    with profiler.profile(f"verify_project_{project_id}", requested=profile_requested(data)) as profile_info:
+        payload, status_code = _verify_single_project(project_id, data)
+    
+    if profile_info.get('profile'):
+        payload['profile'] = profile_info['profile']
+    if profile_info.get('profile_skipped'):
+        payload['profile_skipped'] = profile_info['profile_skipped']
+    return jsonify(payload), status_code
+
+def _verify_single_project(project_id, data):
+    """Score one project and return (payload, status code)"""
     try:
         # Get single project from database
         projects_collection = get_verifier().db.projects
@@ -74,56 +255,90 @@ def verify_single_project(project_id):
         try:
             oid = ObjectId(project_id)
         except Exception:
-            return jsonify({"error": "Invalid project ID"}), 400
+            return {"error": "Invalid project ID"}, 400
         project = projects_collection.find_one({"_id": oid})
         
         if not project:
-            return jsonify({"error": "Project not found"}), 404
+            return {"error": "Project not found"}, 404
         
-        # Prepare data
-        df = get_verifier().prepare_project_data([project])
-        
-        # Make prediction
-        predictions = get_verifier().predict_projects(df)
+        # Lease the project so a worker or batch run that reaches it meanwhile skips it
+        dry_run = data.get('dry_run', False)
+        token = None
+        if not dry_run:
+            token, refusal = get_verifier().claim_project(project_id, f"api:{socket.gethostname()}:{os.getpid()}")
+            if token is None:
+                return refusal, 409
         
-        if predictions:
-            prediction_result = predictions[0]
-            
-            # Generate notes
-            project_data = df.iloc[0].to_dict()
-            notes = get_verifier().generate_verification_notes(
-                project_data, 
-                prediction_result['prediction'], 
-                prediction_result['confidence']
-            )
-            
-            # Update database if not dry run
-            dry_run = request.get_json().get('dry_run', False) if request.get_json() else False
+        try:
+            # Make prediction
+            started = time.perf_counter()
+            prediction_result, project_data = get_verifier().predict_project(project)
+            latency_ms = (time.perf_counter() - started) * 1000
             
-            if not dry_run:
-                success = get_verifier().update_project_status(
-                    project_id,
-                    prediction_result['prediction'],
+            if prediction_result:
+                # Check for near-duplicates of already indexed projects
+                near_duplicate = get_verifier().find_near_duplicates(
+                    [project_data['_id']], [project_data['combined_text']], persist=not dry_run
+                )[0]
+                if near_duplicate:
+                    prediction_result['near_duplicate_of'] = {
+                        'project_id': near_duplicate[0],
+                        'similarity': near_duplicate[1]
+                    }
+                
+                # Generate notes
+                notes = get_verifier().generate_verification_notes(
+                    project_data, 
+                    prediction_result['prediction'], 
                     prediction_result['confidence'],
-                    notes
+                    near_duplicate=near_duplicate
                 )
-                prediction_result['updated'] = success
+                
+                # Update database if not dry run
+                
+                success = None
+                if not dry_run:
+                    success = get_verifier().update_project_status(
+                        project_id,
+                        prediction_result['prediction'],
+                        prediction_result['confidence'],
+                        notes,
+                        lease_token=token
+                    )
+                    prediction_result['updated'] = success
+                
+                if success:
+                    get_verifier().record_rollup(
+                        int(prediction_result['prediction'] == 1), int(prediction_result['prediction'] != 1), 0,
+                        [prediction_result['confidence']]
+                    )
+                
+                get_verifier().audit_prediction(
+                    prediction_result, project_data, None,
+                    'approved' if prediction_result['prediction'] == 1 else 'rejected',
+                    latency_ms, source='api', dry_run=dry_run, updated=success
+                )
+                
+                prediction_result['notes'] = notes
+                return prediction_result, 200
             
-            prediction_result['notes'] = notes
-            return jsonify(prediction_result)
-        
-        else:
-            return jsonify({"error": "Failed to make prediction"}), 500
+            else:
+                return {"error": "Failed to make prediction"}, 500
+                
+        finally:
+            if token is not None:
+                # Only left behind when the write failed; make it claimable again right away
+                get_verifier().release_claim(token, recheck_seconds=0)
             
     except Exception as e:
         logger.error(f"Error verifying single project: {e}")
-        return jsonify({"error": str(e)}), 500
+        return {"error": str(e)}, 500
 
 @app.route('/pending', methods=['GET'])
 def get_pending_projects():
     """Get list of pending projects"""
     try:
-        projects = get_verifier().get_pending_projects()
+        projects = get_verifier().get_pending_projects(read_only=True)
         
         # Convert ObjectId to string for JSON serialization
         serialized_projects = []
@@ -142,14 +357,66 @@ def get_pending_projects():
         logger.error(f"Error getting pending projects: {e}")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/model/retrain', methods=['POST'])
-def retrain_model():
-    """Trigger model retraining (placeholder for future implementation)"""
+@app.route('/admin/profiles', methods=['GET'])
+@require_admin_token
+def list_profiles():
+    """List stored run profiles"""
+    profiles = profiler.list_profiles()
     return jsonify({
-        "message": "Model retraining not implemented yet",
-        "status": "pending"
+        "count": len(profiles),
+        "sample_rate": profiler.sample_rate,
+        "profiles": profiles
     })
 
+@app.route('/admin/profiles/<name>', methods=['GET'])
+@require_admin_token
+def download_profile(name):
+    """Download a stored profile, or a text summary with ?format=text"""
+    if request.args.get('format') == 'text':
+        sort_by = request.args.get('sort', 'cumulative')
+        if sort_by not in PROFILE_SORT_KEYS:
+            return jsonify({"error": f"sort must be one of {sorted(PROFILE_SORT_KEYS)}"}), 400
+        summary = profiler.summarize(name, sort_by=sort_by)
+        if summary is None:
+            return jsonify({"error": "Profile not found"}), 404
+        return summary, 200, {'Content-Type': 'text/plain; charset=utf-8'}
+    
+    path = profiler.profile_path(name)
+    if path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(path.resolve(), as_attachment=True, download_name=name)
+
+@app.route('/admin/mongo', methods=['GET'])
+@require_admin_token
+def mongo_pool_stats():
+    """Shared MongoDB pool statistics, including checkout wait times"""
+    return jsonify(connection_manager.get_stats())
+
+@app.route('/admin/category-models', methods=['GET'])
+@require_admin_token
+def category_model_stats():
+    """Per-category model cache: loads, hits, evictions and routed rows"""
+    router = get_verifier().category_router
+    if router is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(router.get_stats(), enabled=True))
+
+@app.route('/model/retrain', methods=['POST'])
+@require_admin_token
+def retrain_model():
+    """Fold new moderator decisions into the online model and publish a new version"""
+    try:
+        data = request.get_json() or {}
+        learner = OnlineLearner(get_verifier(), batch_size=int(data.get('batch_size', 256)))
+        result = learner.update()
+        if result.get("skipped"):
+            return jsonify(result), 409
+        get_verifier().refresh_model(force=True)
+        return jsonify(result)
+    except Exception as e:
+        logger.error(f"Error updating online model: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({"error": "Endpoint not found"}), 404
@@ -0,0 +1,217 @@
+# ai_service/verification_rules.py
+import json
+import logging
+import operator
+import os
+import re
+from typing import Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'verification_rules.json')
+
+COMPARISONS = {
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'eq': operator.eq,
+    'ne': operator.ne,
+}
+
+# Joins a batch of texts into one string; phrases never contain it,
+# so a match can never straddle two projects
+TEXT_SEPARATOR = '\x00'
+
+
+class PhraseMatcher:
+    """
+    Finds which of a set of phrases occur in each text of a batch.
+
+    All phrases are compiled into one alternation wrapped in a lookahead, and
+    the whole batch is scanned with a single finditer pass. Longer phrases are
+    tried first, so the regex reports only the longest phrase starting at each
+    position; any shorter phrase starting there is a prefix of it, and those
+    prefix hits are added afterwards so every phrase present is reported.
+    """
+
+    def __init__(self, phrases: Sequence[str]):
+        self.phrases = list(dict.fromkeys(str(p).lower() for p in phrases if p))
+        order = sorted(range(len(self.phrases)), key=lambda i: -len(self.phrases[i]))
+        self._group_to_phrase = np.array(order, dtype=np.intp)
+        alternation = '|'.join(f'({re.escape(self.phrases[i])})' for i in order)
+        self._pattern = re.compile(f'(?=(?:{alternation}))') if self.phrases else None
+
+        # _prefixes[i, j] is True when phrase j is a prefix of phrase i (or i itself)
+        self._prefixes = np.array(
+            [[longer.startswith(shorter) for shorter in self.phrases] for longer in self.phrases],
+            dtype=bool
+        ).reshape(len(self.phrases), len(self.phrases))
+        self._has_prefixes = bool(self._prefixes.sum() > len(self.phrases))
+
+    def match(self, texts: Sequence) -> np.ndarray:
+        """Return a (len(texts), len(phrases)) boolean hit matrix"""
+        lowered = [str(text).lower() for text in texts]
+        hits = np.zeros((len(lowered), len(self.phrases)), dtype=bool)
+        if self._pattern is None or not lowered:
+            return hits
+
+        joined = TEXT_SEPARATOR.join(lowered)
+        lengths = np.fromiter((len(text) + 1 for text in lowered), dtype=np.int64, count=len(lowered))
+        starts = np.concatenate(([0], np.cumsum(lengths[:-1])))
+
+        positions = []
+        groups = []
+        for match in self._pattern.finditer(joined):
+            positions.append(match.start())
+            groups.append(match.lastindex - 1)
+
+        if positions:
+            rows = np.searchsorted(starts, positions, side='right') - 1
+            hits[rows, self._group_to_phrase[groups]] = True
+            if self._has_prefixes:
+                hits = (hits.astype(np.uint8) @ self._prefixes.astype(np.uint8)) > 0
+        return hits
+
+
+class NoteRuleEngine:
+    """
+    Evaluates verification note rules over a whole batch of projects.
+
+    Rules are grouped by outcome ('rejected' / 'approved') and evaluated in
+    order, so notes keep the order they are listed in. Each rule is one of:
+
+    - {"note": ...}                                   always applies
+    - {"note": ..., "field": f, "op": "lt", "value": v}  numeric comparison
+    - {"note": ..., "field": f, "phrases": [...]}        any phrase in text field
+
+    Rules sharing a "group" are exclusive: only the first matching rule of a
+    group adds its note. The 'confidence' field refers to the prediction
+    confidence rather than a project column.
+    """
+
+    OUTCOMES = {'rejected': 0, 'approved': 1}
+
+    def __init__(self, rules: Dict[str, List[Dict]]):
+        self.rules = {outcome: list(rules.get(outcome, [])) for outcome in self.OUTCOMES}
+        self._validate()
+
+        # One matcher per text field covering every phrase rule on that field
+        phrases_by_field = {}
+        for rule in self._all_rules():
+            if 'phrases' in rule:
+                phrases_by_field.setdefault(rule['field'], []).extend(rule['phrases'])
+        self._matchers = {field: PhraseMatcher(phrases) for field, phrases in phrases_by_field.items()}
+
+        # Column indices into each field's hit matrix, per phrase rule
+        self._phrase_columns = {}
+        for rule in self._all_rules():
+            if 'phrases' in rule:
+                matcher_phrases = self._matchers[rule['field']].phrases
+                self._phrase_columns[id(rule)] = [matcher_phrases.index(str(p).lower()) for p in rule['phrases'] if p]
+
+    @classmethod
+    def from_config(cls, path: Optional[str] = None) -> 'NoteRuleEngine':
+        """Load rules from VERIFICATION_RULES_PATH or the bundled rules file"""
+        path = path or os.getenv('VERIFICATION_RULES_PATH', DEFAULT_RULES_PATH)
+        try:
+            with open(path, 'r') as f:
+                rules = json.load(f)
+            engine = cls(rules)
+            logger.info(f"Loaded {sum(len(r) for r in engine.rules.values())} verification note rules from {path}")
+            return engine
+        except Exception as e:
+            logger.error(f"Error loading verification rules from {path}: {e}")
+            return cls({})
+
+    def _all_rules(self):
+        for outcome_rules in self.rules.values():
+            yield from outcome_rules
+
+    def _validate(self):
+        for rule in self._all_rules():
+            if 'note' not in rule:
+                raise ValueError(f"Rule without note: {rule}")
+            if 'phrases' in rule and 'field' not in rule:
+                raise ValueError(f"Phrase rule without field: {rule}")
+            if 'op' in rule and rule['op'] not in COMPARISONS:
+                raise ValueError(f"Unknown comparison '{rule['op']}' in rule: {rule}")
+
+    def _column(self, columns: Mapping, field: str, n: int, confidences: np.ndarray):
+        if field == 'confidence':
+            return confidences
+        if field not in columns:
+            return None
+        values = columns[field]
+        return values if len(values) == n else None
+
+    def _rule_mask(self, rule: Dict, columns: Mapping, n: int, confidences: np.ndarray,
+                   phrase_hits: Dict[str, np.ndarray]) -> np.ndarray:
+        field = rule.get('field')
+        if field is None:
+            return np.ones(n, dtype=bool)
+
+        if 'phrases' in rule:
+            hits = phrase_hits.get(field)
+            if hits is None:
+                return np.zeros(n, dtype=bool)
+            return hits[:, self._phrase_columns[id(rule)]].any(axis=1)
+
+        values = self._column(columns, field, n, confidences)
+        if values is None:
+            return np.zeros(n, dtype=bool)
+        numeric = np.asarray(values, dtype=float)
+        with np.errstate(invalid='ignore'):
+            return COMPARISONS[rule.get('op', 'gt')](numeric, float(rule.get('value', 0)))
+
+    def evaluate(self, columns: Mapping, predictions: Sequence[int], confidences: Sequence[float],
+                 extra_notes: Sequence[Optional[List[str]]] = None) -> List[str]:
+        """
+        Build verification notes for every project in the batch.
+
+        `columns` maps field names to equal-length sequences (a DataFrame
+        works), aligned with `predictions` and `confidences`. `extra_notes`
+        optionally holds per-project notes computed outside the rules.
+        """
+        predictions = np.asarray(predictions, dtype=int)
+        confidences = np.asarray(confidences, dtype=float)
+        n = len(predictions)
+
+        phrase_hits = {}
+        for field, matcher in self._matchers.items():
+            values = self._column(columns, field, n, confidences)
+            if values is not None:
+                phrase_hits[field] = matcher.match(values)
+
+        notes = [[] for _ in range(n)]
+        for outcome, label in self.OUTCOMES.items():
+            outcome_mask = predictions == label
+            if not outcome_mask.any():
+                continue
+            groups_taken = {}
+            for rule in self.rules[outcome]:
+                mask = outcome_mask & self._rule_mask(rule, columns, n, confidences, phrase_hits)
+                group = rule.get('group')
+                if group is not None:
+                    taken = groups_taken.setdefault(group, np.zeros(n, dtype=bool))
+                    mask &= ~taken
+                    taken |= mask
+                for i in np.flatnonzero(mask):
+                    notes[i].append(rule['note'])
+
+        if extra_notes is not None:
+            for i, project_notes in enumerate(extra_notes):
+                if project_notes:
+                    notes[i].extend(project_notes)
+
+        return [format_notes(confidences[i], notes[i]) for i in range(n)]
+
+
+def format_notes(confidence: float, notes: List[str]) -> str:
+    """Prefix rule notes with the confidence summary"""
+    base_note = f"Auto-verified with {confidence*100:.1f}% confidence"
+    if notes:
+        return f"{base_note}. {'; '.join(notes)}"
+    return base_note
@@ -0,0 +1,137 @@
+# ai_service/worker.py
+import argparse
+import logging
+import os
+import socket
+import time
+from typing import Dict, List
+
+import pymongo
+from dotenv import load_dotenv
+
+from auto_verification_service import MongoDBProjectVerifier
+from mongo_connection import connection_manager
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class VerificationWorker:
+    """
+    Verification worker that can run on several nodes at once.
+
+    Each worker claims a batch of pending projects by stamping a lease
+    (owner, batch token, expiry) on them with a conditional update, so a
+    project is only ever leased to one worker. Decisions are written only
+    while the lease is still held, and leases of crashed workers simply
+    expire and become claimable again. Projects left for manual review get
+    a lease with no owner that expires after `recheck_seconds`, so they are
+    not re-scored on every batch.
+    """
+
+    def __init__(self, verifier: MongoDBProjectVerifier = None, worker_id: str = None, batch_size: int = 50,
+                 lease_seconds: int = 300, recheck_seconds: int = 1800, confidence_threshold: float = 0.75,
+                 sort=None):
+        self.verifier = verifier or MongoDBProjectVerifier()
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.recheck_seconds = recheck_seconds
+        self.confidence_threshold = confidence_threshold
+        self.sort = sort or [("createdAt", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]
+        self.projects = self.verifier.db.projects
+        self.stats = {"batches": 0, "claimed": 0, "approved": 0, "rejected": 0, "manual_review": 0}
+        self.ensure_indexes()
+
+    def ensure_indexes(self):
+        try:
+            self.projects.create_index([("status", pymongo.ASCENDING), ("lease.expiresAt", pymongo.ASCENDING)])
+            self.projects.create_index("lease.token", sparse=True)
+        except Exception as e:
+            logger.warning(f"Could not create lease indexes: {e}")
+
+    def claim_batch(self) -> List[Dict]:
+        """Lease up to batch_size (or the MEMORY_BUDGET_MB-sized batch) pending projects to this worker"""
+        token, _ = self.verifier.claim_pending_projects(self.worker_id, sort=self.sort,
+                                                        limit=self.verifier.batch_size(self.batch_size),
+                                                        lease_seconds=self.lease_seconds)
+        if token is None:
+            return []
+        return list(self.projects.find({"lease.token": token}, {"_id": 1, "lease.token": 1}))
+
+    def release_remaining(self, token: str):
+        """Defer re-checking of claimed projects that were not decided"""
+        self.verifier.release_claim(token, self.recheck_seconds)
+
+    def run_once(self) -> Dict:
+        """Claim and process one batch"""
+        projects = self.claim_batch()
+        if not projects:
+            return {"processed": 0, "approved": 0, "rejected": 0, "manual_review": 0, "claimed": 0}
+
+        token = projects[0]["lease"]["token"]
+        started = time.perf_counter()
+        try:
+            df = self.verifier.load_project_frame({"lease.token": token}, sort=self.sort)
+            result = self.verifier.verify_frame(df, self.confidence_threshold, dry_run=False, lease_token=token)
+        finally:
+            self.release_remaining(token)
+
+        elapsed = time.perf_counter() - started
+        result["claimed"] = len(projects)
+        self.stats["batches"] += 1
+        self.stats["claimed"] += len(projects)
+        for key in ("approved", "rejected", "manual_review"):
+            self.stats[key] += result.get(key, 0)
+        logger.info(f"Worker {self.worker_id} processed {len(projects)} projects in {elapsed:.2f}s "
+                    f"({len(projects) / elapsed if elapsed else 0:.1f}/s)")
+        return result
+
+    def run_forever(self, idle_sleep: float = 30):
+        """Process batches until interrupted, sleeping when nothing is claimable"""
+        logger.info(f"Worker {self.worker_id} started (batch size {self.batch_size}, lease {self.lease_seconds}s)")
+        while True:
+            try:
+                result = self.run_once()
+                if result.get("claimed", 0) == 0:
+                    time.sleep(idle_sleep)
+            except Exception as e:
+                logger.error(f"Worker batch failed: {e}")
+                time.sleep(idle_sleep)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lease-based verification worker')
+    parser.add_argument('--batch-size', type=int, default=int(os.getenv('WORKER_BATCH_SIZE', 50)))
+    parser.add_argument('--lease-seconds', type=int, default=int(os.getenv('WORKER_LEASE_SECONDS', 300)))
+    parser.add_argument('--recheck-seconds', type=int, default=int(os.getenv('WORKER_RECHECK_SECONDS', 1800)))
+    parser.add_argument('--idle-sleep', type=float, default=float(os.getenv('WORKER_IDLE_SLEEP', 30)))
+    parser.add_argument('--confidence', type=float, default=0.75, help='Confidence threshold')
+    parser.add_argument('--worker-id', help='Lease owner name (defaults to host:pid)')
+    parser.add_argument('--once', action='store_true', help='Process a single batch and exit')
+
+    args = parser.parse_args()
+
+    worker = VerificationWorker(
+        worker_id=args.worker_id,
+        batch_size=args.batch_size,
+        lease_seconds=args.lease_seconds,
+        recheck_seconds=args.recheck_seconds,
+        confidence_threshold=args.confidence
+    )
+    try:
+        if args.once:
+            logger.info(f"Batch result: {worker.run_once()}")
+        else:
+            worker.run_forever(args.idle_sleep)
+    except KeyboardInterrupt:
+        logger.info("Worker stopped")
+    finally:
+        worker.verifier.close_connection()
+        connection_manager.close_all()
+
+
+if __name__ == "__main__":
+    main()